@@ -0,0 +1,86 @@
+import numpy as np
+
+from FaceModel import FittedFaceModel
+
+# Способы обучения PCA для корпусов лиц разного размера:
+#   full        - точное SVD, вся матрица в памяти (как раньше для Olivetti);
+#   randomized  - рандомизированное SVD, быстрее при n_components << h*w,
+#                 но матрица всё ещё загружается целиком;
+#   incremental - IncrementalPCA по мини-батчам, строки читаются из memmap,
+#                 в памяти одновременно только батч и модель.
+# Остальные проходы по данным (границы коэффициентов, ошибка восстановления)
+# тоже идут батчами, так что для incremental корпус целиком не читается в RAM.
+DEFAULT_BATCH_SIZE = 2048
+
+
+def _fit_full(X, n_components, whiten, batch_size, random_state):
+    from sklearn.decomposition import PCA
+    return PCA(n_components=n_components, whiten=whiten, svd_solver="full").fit(np.asarray(X))
+
+
+def _fit_randomized(X, n_components, whiten, batch_size, random_state):
+    from sklearn.decomposition import PCA
+    return PCA(n_components=n_components, whiten=whiten, svd_solver="randomized",
+               random_state=random_state).fit(np.asarray(X))
+
+
+def _fit_incremental(X, n_components, whiten, batch_size, random_state):
+    from sklearn.decomposition import IncrementalPCA
+    # partial_fit требует в каждом батче не меньше n_components строк,
+    # поэтому короткий хвост присоединяется к предыдущему батчу.
+    batch_size = max(batch_size, n_components)
+    pca = IncrementalPCA(n_components=n_components, whiten=whiten)
+    n = X.shape[0]
+    bounds = list(range(0, n, batch_size)) + [n]
+    if len(bounds) > 2 and bounds[-1] - bounds[-2] < n_components:
+        del bounds[-2]
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        pca.partial_fit(X[start:stop])
+    return pca
+
+
+SOLVERS = {
+    "full": _fit_full,
+    "randomized": _fit_randomized,
+    "incremental": _fit_incremental,
+}
+
+
+def iter_batches(X, batch_size=DEFAULT_BATCH_SIZE):
+    for start in range(0, X.shape[0], batch_size):
+        yield np.asarray(X[start:start + batch_size], dtype=np.float64)
+
+
+def coefficient_range(model, X, batch_size=DEFAULT_BATCH_SIZE):
+    lo = np.full(model.n_components, np.inf)
+    hi = np.full(model.n_components, -np.inf)
+    for batch in iter_batches(X, batch_size):
+        coef = model.transform(batch)
+        np.minimum(lo, coef.min(axis=0), out=lo)
+        np.maximum(hi, coef.max(axis=0), out=hi)
+    return lo, hi
+
+
+def reconstruction_error(model, X, batch_size=DEFAULT_BATCH_SIZE):
+    # Доля дисперсии, не объяснённая моделью: ||X - X_rec||^2 / ||X - mean||^2.
+    residual = total = 0.0
+    for batch in iter_batches(X, batch_size):
+        centered = batch - model.mean
+        rec = model.inverse_transform(model.transform(batch))
+        residual += np.square(batch - rec).sum()
+        total += np.square(centered).sum()
+    return residual / total if total else 0.0
+
+
+def fit_model(images, n_components=150, whiten=True, solver="full",
+              batch_size=DEFAULT_BATCH_SIZE, random_state=0):
+    try:
+        fit = SOLVERS[solver]
+    except KeyError:
+        raise ValueError(f"unknown solver {solver!r}, expected one of {', '.join(SOLVERS)}") from None
+    X = images.reshape(images.shape[0], -1)
+    pca = fit(X, n_components, whiten, batch_size, random_state)
+    model = FittedFaceModel(pca.mean_, pca.components_, pca.explained_variance_,
+                            None, None, pca.whiten, images.shape[1:])
+    model.coef_min, model.coef_max = coefficient_range(model, X, batch_size)
+    return model
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+
+class IncrementalReconstructor:
+    # Восстановление лица из коэффициентов PCA без полного inverse_transform:
+    # face = mean + coef @ rows, где rows - компоненты, уже умноженные на
+    # sqrt(explained_variance) при whiten=True. Изменение одного коэффициента
+    # обновляет готовое изображение как face += delta * rows[i] в заранее
+    # выделенном буфере. Чтобы накопленная ошибка округления не росла, раз в
+    # resync_every шагов изображение пересчитывается целиком.
+    def __init__(self, mean, components, explained_variance=None, whiten=True, shape=None,
+                 resync_every=1024):
+        components = np.asarray(components, dtype=np.float64)
+        if whiten:
+            components = components * np.sqrt(np.asarray(explained_variance, dtype=np.float64))[:, np.newaxis]
+        self.rows = np.ascontiguousarray(components)
+        self.mean = np.asarray(mean, dtype=np.float64).ravel()
+        self.coef = np.zeros(self.rows.shape[0])
+        self.buffer = self.mean.copy()
+        self.image = self.buffer.reshape(shape) if shape is not None else self.buffer
+        self.resync_every = resync_every
+        self._scratch = np.empty_like(self.buffer)
+        self._steps = 0
+
+    @classmethod
+    def from_pca(cls, pca, shape=None, **kwargs):
+        return cls(pca.mean_, pca.components_, pca.explained_variance_, pca.whiten, shape, **kwargs)
+
+    @property
+    def n_components(self):
+        return self.rows.shape[0]
+
+    def set(self, index, value):
+        delta = value - self.coef[index]
+        if delta == 0:
+            return self.image
+        self.coef[index] = value
+        np.multiply(self.rows[index], delta, out=self._scratch)
+        self.buffer += self._scratch
+        return self._step()
+
+    def set_many(self, indices, values):
+        indices = np.asarray(indices)
+        values = np.asarray(values, dtype=np.float64)
+        delta = values - self.coef[indices]
+        changed = delta != 0
+        if not changed.any():
+            return self.image
+        indices, delta = indices[changed], delta[changed]
+        self.coef[indices] = values[changed]
+        np.dot(delta, self.rows[indices], out=self._scratch)
+        self.buffer += self._scratch
+        return self._step()
+
+    def reset(self, coef=None):
+        if coef is None:
+            self.coef[:] = 0
+        else:
+            self.coef[:] = coef
+        return self.resync()
+
+    def resync(self):
+        np.dot(self.coef, self.rows, out=self.buffer)
+        self.buffer += self.mean
+        self._steps = 0
+        return self.image
+
+    def _step(self):
+        self._steps += 1
+        if self._steps >= self.resync_every:
+            return self.resync()
+        return self.image
+
+
+# Обученная модель PCA в виде набора .npy в каталоге кэша: mean, components,
+# explained_variance и границы коэффициентов по обучающей выборке (для
+# диапазонов ползунков). Каталог называется по хэшу данных и параметров PCA,
+# массивы открываются через memmap, поэтому при попадании в кэш sklearn не
+# импортируется вовсе.
+DEFAULT_CACHE_DIR = os.environ.get("FACE_PCA_CACHE",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "face_pca"))
+MODEL_ARRAYS = ("mean", "components", "explained_variance", "coef_min", "coef_max")
+
+
+class FittedFaceModel:
+    def __init__(self, mean, components, explained_variance, coef_min, coef_max, whiten=True,
+                 image_shape=None):
+        self.mean = mean
+        self.components = components
+        self.explained_variance = explained_variance
+        self.coef_min = coef_min
+        self.coef_max = coef_max
+        self.whiten = whiten
+        self.image_shape = tuple(image_shape) if image_shape is not None else None
+
+    @property
+    def n_components(self):
+        return self.components.shape[0]
+
+    def transform(self, X):
+        coef = (np.asarray(X, dtype=np.float64) - self.mean) @ self.components.T
+        if self.whiten:
+            coef /= np.sqrt(self.explained_variance)
+        return coef
+
+    def inverse_transform(self, coef):
+        coef = np.asarray(coef, dtype=np.float64)
+        if self.whiten:
+            coef = coef * np.sqrt(self.explained_variance)
+        return coef @ self.components + self.mean
+
+    def reconstructor(self, **kwargs):
+        return IncrementalReconstructor(self.mean, self.components, self.explained_variance,
+                                        self.whiten, self.image_shape, **kwargs)
+
+    def save(self, directory, **meta):
+        # Пишем во временный каталог и переименовываем: прерванная запись не
+        # оставляет наполовину заполненный кэш.
+        tmp = directory + f".tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        for name in MODEL_ARRAYS:
+            np.save(os.path.join(tmp, name + ".npy"), np.asarray(getattr(self, name)))
+        meta = dict(meta, whiten=bool(self.whiten), image_shape=self.image_shape,
+                    n_components=self.n_components)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        try:
+            os.replace(tmp, directory)
+        except OSError:
+            # Каталог уже создан параллельным запуском с тем же ключом.
+            shutil.rmtree(tmp, ignore_errors=True)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+                  for name in MODEL_ARRAYS}
+        return cls(whiten=meta["whiten"], image_shape=meta["image_shape"], **arrays)
+
+
+def dataset_hash(X):
+    X = np.ascontiguousarray(X)
+    h = hashlib.sha256(f"{X.dtype.str}{X.shape}".encode())
+    h.update(memoryview(X).cast("B"))
+    return h.hexdigest()
+
+
+def model_key(data_hash, **params):
+    payload = json.dumps({"data": data_hash, **params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def load_faces(path=None, cache_dir=DEFAULT_CACHE_DIR):
+    # Изображения лиц (n, h, w) float32. Без пути берётся локальная копия
+    # Olivetti из каталога кэша; при первом запуске она скачивается через
+    # sklearn и сохраняется, дальше работа возможна без сети и без sklearn.
+    if path is None:
+        path = os.path.join(cache_dir, "olivetti_faces.npy")
+        if not os.path.exists(path):
+            from sklearn.datasets import fetch_olivetti_faces
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = path + f".tmp-{os.getpid()}.npy"
+            np.save(tmp, fetch_olivetti_faces().images.astype(np.float32))
+            os.replace(tmp, path)
+    if path.endswith(".npz"):
+        with np.load(path) as archive:
+            images = archive["images"]
+    else:
+        images = np.load(path, mmap_mode="r")
+    if images.ndim != 3:
+        raise ValueError(f"{path}: expected an (n, h, w) array of images, got shape {images.shape}")
+    return images
+
+
+def load_or_fit(images, n_components=150, whiten=True, cache_dir=DEFAULT_CACHE_DIR, solver="full",
+                batch_size=None):
+    X = images.reshape(images.shape[0], -1)
+    data_hash = dataset_hash(X)
+    params = {"n_components": n_components, "whiten": whiten, "solver": solver}
+    if solver == "incremental" and batch_size is not None:
+        params["batch_size"] = batch_size
+    directory = os.path.join(cache_dir, "pca-" + model_key(data_hash, **params))
+    if os.path.exists(os.path.join(directory, "meta.json")):
+        return FittedFaceModel.load(directory)
+
+    from FaceDecomposition import DEFAULT_BATCH_SIZE, fit_model
+    model = fit_model(images, n_components, whiten, solver, batch_size or DEFAULT_BATCH_SIZE)
+    os.makedirs(cache_dir, exist_ok=True)
+    model.save(directory, data_hash=data_hash, **params)
+    return FittedFaceModel.load(directory)
@@ -0,0 +1,246 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+
+from FaceModel import DEFAULT_CACHE_DIR, FittedFaceModel, load_faces, load_or_fit
+from FaceDecomposition import DEFAULT_BATCH_SIZE
+
+# Пакетная работа с обученной моделью без GUI: проекция новых изображений
+# в пространство PCA и восстановление по компонентам, ошибка восстановления
+# каждого изображения (оценка аномальности: чем хуже модель описывает лицо,
+# тем оно "необычнее") и поиск ближайших лиц по индексу спроецированных
+# координат.
+#
+# Координаты индекса не отбелены (coef * sqrt(explained_variance)), поэтому
+# расстояние между ними равно расстоянию между восстановленными изображениями
+# в пикселях. Поиск - блочный полный перебор через матричное умножение во
+# float32: при 50-150 компонентах KD-дерево не быстрее перебора.
+INDEX_BLOCK_BYTES = 64 * 2 ** 20
+
+
+def project(model, images, batch_size=DEFAULT_BATCH_SIZE):
+    # Возвращает неотбеленные координаты (n, k) float32 и среднеквадратичную
+    # ошибку восстановления по пикселям для каждого изображения.
+    X = images.reshape(images.shape[0], -1)
+    scale = np.sqrt(model.explained_variance) if model.whiten else 1.0
+    coords = np.empty((X.shape[0], model.n_components), dtype=np.float32)
+    errors = np.empty(X.shape[0])
+    for start in range(0, X.shape[0], batch_size):
+        batch = np.asarray(X[start:start + batch_size], dtype=np.float64)
+        coef = model.transform(batch)
+        rec = model.inverse_transform(coef)
+        coords[start:start + len(batch)] = coef * scale
+        errors[start:start + len(batch)] = np.square(batch - rec).mean(axis=1)
+    return coords, errors
+
+
+def reconstruct(model, images, batch_size=DEFAULT_BATCH_SIZE):
+    X = images.reshape(images.shape[0], -1)
+    out = np.empty(X.shape, dtype=np.float32)
+    for start in range(0, X.shape[0], batch_size):
+        batch = np.asarray(X[start:start + batch_size], dtype=np.float64)
+        out[start:start + len(batch)] = model.inverse_transform(model.transform(batch))
+    return out.reshape(images.shape)
+
+
+class FaceIndex:
+    def __init__(self, model, coords, errors=None):
+        self.model = model
+        self.coords = np.ascontiguousarray(coords, dtype=np.float32)
+        self.errors = errors
+        self.sq_norms = np.einsum("ij,ij->i", self.coords, self.coords)
+
+    @classmethod
+    def build(cls, model, images, batch_size=DEFAULT_BATCH_SIZE):
+        coords, errors = project(model, images, batch_size)
+        return cls(model, coords, errors)
+
+    def __len__(self):
+        return self.coords.shape[0]
+
+    def query(self, coords, k=5):
+        # Блоками запросов: |q - c|^2 = |q|^2 - 2 q.c + |c|^2, k лучших через
+        # argpartition, потом сортировка только этих k. В пустом индексе
+        # соседей нет: результат формы (m, 0).
+        coords = np.atleast_2d(np.asarray(coords, dtype=np.float32))
+        m, n = coords.shape[0], len(self)
+        k = min(k, n)
+        indices = np.empty((m, k), dtype=np.intp)
+        distances = np.empty((m, k), dtype=np.float32)
+        if k == 0:
+            return distances, indices
+        block = max(1, INDEX_BLOCK_BYTES // (4 * n))
+        for start in range(0, m, block):
+            q = coords[start:start + block]
+            d2 = q @ self.coords.T
+            d2 *= -2
+            d2 += self.sq_norms
+            d2 += np.einsum("ij,ij->i", q, q)[:, np.newaxis]
+            if k < n:
+                top = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(n), d2.shape)
+            top_d2 = np.take_along_axis(d2, top, axis=1)
+            order = np.argsort(top_d2, axis=1, kind="stable")
+            indices[start:start + len(q)] = np.take_along_axis(top, order, axis=1)
+            distances[start:start + len(q)] = np.take_along_axis(top_d2, order, axis=1)
+        np.maximum(distances, 0, out=distances)
+        return np.sqrt(distances, out=distances), indices
+
+    def search(self, images, k=5, batch_size=DEFAULT_BATCH_SIZE):
+        coords, errors = project(self.model, images, batch_size)
+        distances, indices = self.query(coords, k)
+        return distances, indices, errors
+
+    def save(self, directory):
+        # Индекс собирается во временном каталоге и подменяет прежний целиком:
+        # модель и координаты в каталоге всегда от одной сборки.
+        target = os.path.normpath(directory)
+        tmp = f"{target}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        self.model.save(os.path.join(tmp, "model"))
+        for name, array in (("coords", self.coords), ("errors", self.errors)):
+            if array is not None:
+                np.save(os.path.join(tmp, name + ".npy"), array)
+        old = None
+        if os.path.exists(target):
+            old = f"{target}.old-{os.getpid()}"
+            os.replace(target, old)
+        os.replace(tmp, target)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+        return directory
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        model = FittedFaceModel.load(os.path.join(directory, "model"), mmap_mode)
+        errors_path = os.path.join(directory, "errors.npy")
+        errors = np.load(errors_path, mmap_mode=mmap_mode) if os.path.exists(errors_path) else None
+        return cls(model, np.load(os.path.join(directory, "coords.npy"), mmap_mode=mmap_mode), errors)
+
+
+def _load_images(path):
+    if path.endswith(".npz"):
+        with np.load(path) as archive:
+            return archive["images"]
+    return np.load(path, mmap_mode="r")
+
+
+def _fit(args):
+    faces = load_faces(args.faces, args.cache_dir)
+    return faces, load_or_fit(faces, args.components, cache_dir=args.cache_dir, solver=args.solver)
+
+
+def cmd_index(args):
+    faces, model = _fit(args)
+    t0 = time.perf_counter()
+    index = FaceIndex.build(model, faces, args.batch_size)
+    index.save(args.index)
+    elapsed = time.perf_counter() - t0
+    print(f"indexed {len(index)} faces, {model.n_components} components in {elapsed:.2f} s "
+          f"({len(index) / elapsed:.0f} images/s)", file=sys.stderr)
+    return 0
+
+
+def _model(args):
+    if args.index:
+        return FittedFaceModel.load(os.path.join(args.index, "model"))
+    return _fit(args)[1]
+
+
+def cmd_score(args):
+    model = _model(args)
+    images = _load_images(args.images)
+    t0 = time.perf_counter()
+    _, errors = project(model, images, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    writer = csv.writer(sys.stdout, lineterminator="\n")
+    writer.writerow(("image", "error"))
+    writer.writerows((i, f"{e:.6g}") for i, e in enumerate(errors))
+    print(f"scored {len(errors)} images in {elapsed:.3f} s", file=sys.stderr)
+    return 0
+
+
+def cmd_reconstruct(args):
+    model = _model(args)
+    images = _load_images(args.images)
+    t0 = time.perf_counter()
+    out = reconstruct(model, images, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    np.save(args.output, out)
+    print(f"reconstructed {len(out)} images in {elapsed:.3f} s -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_query(args):
+    index = FaceIndex.load(args.index)
+    images = _load_images(args.images)
+    t0 = time.perf_counter()
+    distances, indices, errors = index.search(images, args.k, args.batch_size)
+    elapsed = time.perf_counter() - t0
+    if args.format == "jsonl":
+        for i in range(len(errors)):
+            sys.stdout.write(json.dumps({"image": i, "error": float(errors[i]),
+                                         "neighbours": indices[i].tolist(),
+                                         "distances": [round(float(d), 6) for d in distances[i]]}) + "\n")
+    else:
+        writer = csv.writer(sys.stdout, lineterminator="\n")
+        writer.writerow(("image", "error", "rank", "neighbour", "distance"))
+        for i in range(len(errors)):
+            for rank in range(indices.shape[1]):
+                writer.writerow((i, f"{errors[i]:.6g}", rank, indices[i, rank], f"{distances[i, rank]:.6g}"))
+    print(f"{len(errors)} queries against {len(index)} faces in {elapsed:.3f} s "
+          f"({len(errors) / elapsed:.0f} queries/s)", file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проекция, оценка аномальности и поиск похожих лиц в пространстве PCA")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def model_args(p):
+        p.add_argument("--faces", help="обучающие изображения .npy/.npz (n, h, w); по умолчанию Olivetti")
+        p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+        p.add_argument("--components", type=int, default=150)
+        p.add_argument("--solver", choices=("full", "randomized", "incremental"), default="full")
+
+    p = sub.add_parser("index", help="спроецировать обучающие лица и сохранить индекс")
+    model_args(p)
+    p.add_argument("index", help="каталог индекса")
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser("score", help="ошибка восстановления для каждого изображения (CSV)")
+    model_args(p)
+    p.add_argument("images", help=".npy/.npz с изображениями той же формы")
+    p.add_argument("--index", help="взять модель из готового индекса вместо обучения")
+    p.set_defaults(func=cmd_score)
+
+    p = sub.add_parser("reconstruct", help="восстановить изображения по компонентам модели (.npy float32)")
+    model_args(p)
+    p.add_argument("images", help=".npy/.npz с изображениями той же формы")
+    p.add_argument("-o", "--output", required=True, help="куда сохранить восстановленные изображения (.npy)")
+    p.add_argument("--index", help="взять модель из готового индекса вместо обучения")
+    p.set_defaults(func=cmd_reconstruct)
+
+    p = sub.add_parser("query", help="k ближайших лиц из индекса для каждого изображения")
+    p.add_argument("index", help="каталог индекса")
+    p.add_argument("images", help=".npy/.npz с изображениями той же формы")
+    p.add_argument("-k", type=int, default=5)
+    p.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    p.set_defaults(func=cmd_query)
+
+    for p in sub.choices.values():
+        p.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
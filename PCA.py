@@ -1,101 +1,225 @@
+import argparse
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
-from sklearn.datasets import fetch_olivetti_faces
 import tkinter as tk
 from tkinter import ttk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.transforms import Bbox
+from FaceModel import DEFAULT_CACHE_DIR, load_faces, load_or_fit
+
+class ComponentSliderPanel:
+    # Прокручиваемая панель ползунков компонент. Виджеты создаются только для
+    # видимых строк (rows штук); при прокрутке те же строки перепривязываются
+    # к другим компонентам, так что число компонент на размер окна не влияет.
+    # Значения берутся из массива values (коэффициенты восстановителя).
+    def __init__(self, master, values, lower, upper, on_change, rows=8):
+        self.values = values
+        self.lower = lower
+        self.upper = upper
+        self.on_change = on_change
+        self.count = len(lower)
+        self.rows = min(rows, self.count)
+        self.first = 0
+        self._binding = False
+        
+        self.frame = tk.Frame(master)
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.yview)
+        self.labels = []
+        self.scales = []
+        self.vars = []
+        for row in range(self.rows):
+            var = tk.DoubleVar(value=0)
+            label = tk.Label(self.frame, width=14, anchor=tk.W)
+            scale = ttk.Scale(
+                self.frame,
+                orient=tk.HORIZONTAL,
+                variable=var,
+                command=lambda val, row=row: self._moved(row, float(val)))
+            label.grid(row=row, column=0, sticky=tk.W)
+            scale.grid(row=row, column=1, sticky=tk.EW)
+            self.labels.append(label)
+            self.scales.append(scale)
+            self.vars.append(var)
+        if self.rows < self.count:
+            self.scrollbar.grid(row=0, column=2, rowspan=self.rows, sticky=tk.NS)
+        self.frame.columnconfigure(1, weight=1)
+        
+        for widget in (self.frame, *self.labels, *self.scales):
+            for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+                widget.bind(sequence, self._wheel)
+        self.refresh()
+    
+    def _moved(self, row, value):
+        if not self._binding:
+            self.on_change(self.first + row, value)
+    
+    def refresh(self):
+        self._binding = True
+        try:
+            for row in range(self.rows):
+                idx = self.first + row
+                self.labels[row].config(text=f'Component {idx+1}:')
+                self.scales[row].config(from_=float(self.lower[idx]), to=float(self.upper[idx]))
+                self.vars[row].set(float(self.values[idx]))
+        finally:
+            self._binding = False
+        self.scrollbar.set(self.first / self.count, (self.first + self.rows) / self.count)
+    
+    def scroll_to(self, first):
+        first = max(0, min(int(first), self.count - self.rows))
+        if first != self.first:
+            self.first = first
+            self.refresh()
+    
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * self.count))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.rows if args[2] == "pages" else 1)
+            self.scroll_to(self.first + step)
+    
+    def _wheel(self, event):
+        self.scroll_to(self.first + (-1 if event.num == 4 or event.delta > 0 else 1))
+        return "break"
 
 class FacePCAApp:
-    def __init__(self, root):
+    # Сколько первых компонент показывать в заголовке, чтобы он оставался читаемым.
+    TITLE_COMPONENTS = 5
+    
+    def __init__(self, root, faces_path=None, cache_dir=DEFAULT_CACHE_DIR, n_components=150,
+                 solver="full", batch_size=None, n_sliders=5, visible_rows=8):
         self.root = root
         self.root.title("Face Reconstruction with PCA")
         
-        self.faces = fetch_olivetti_faces()
-        self.X = self.faces.data
-        self.images = self.faces.images
+        # Модель берётся из кэша на диске; sklearn нужен только при первом обучении
+        self.images = load_faces(faces_path, cache_dir)
         self.n_samples, self.h, self.w = self.images.shape[0], self.images.shape[1], self.images.shape[2]
         
-        self.pca = PCA(n_components=150, whiten=True)
-        self.pca.fit(self.X)
-        self.X_pca = self.pca.transform(self.X)
-        self.mean_face = self.pca.mean_.reshape(self.h, self.w)
+        self.model = load_or_fit(self.images, n_components, whiten=True, cache_dir=cache_dir,
+                                 solver=solver, batch_size=batch_size)
+        self.mean_face = self.model.mean.reshape(self.h, self.w)
         
-        self.current_components = np.zeros(150)
+        self.reconstructor = self.model.reconstructor()
+        self.current_components = self.reconstructor.coef
+        # Хотя бы один ползунок: панель без строк не имеет смысла.
+        self.n_sliders = max(1, min(n_sliders, self.reconstructor.n_components))
+        self.visible_rows = visible_rows
+        self.pending = {}
+        self._flush_id = None
+        self.rng = np.random.default_rng()
+        self.background = None
         
         self.setup_gui()
         self.update_image()
     
     def setup_gui(self):
         self.fig, self.ax = plt.subplots(figsize=(6, 6))
-        self.img = self.ax.imshow(self.mean_face, cmap='gray')
+        self.img = self.ax.imshow(self.mean_face, cmap='gray', animated=True)
         self.ax.axis('off')
-        self.title = self.ax.set_title('Mean face + PCA components')
+        self.title = self.ax.set_title('Mean face + PCA components', animated=True)
         
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.root)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(side=tk.TOP, fill=tk.BOTH, expand=1)
         
         self.sliders_frame = tk.Frame(self.root)
         self.sliders_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
         
-        self.sliders = []
-        self.slider_vars = []
-        
-        for i in range(5):
-            min_val = np.min(self.X_pca[:, i])
-            max_val = np.max(self.X_pca[:, i])
-            
-            var = tk.DoubleVar(value=0)
-            slider = ttk.Scale(
-                self.sliders_frame,
-                from_=min_val,
-                to=max_val,
-                orient=tk.HORIZONTAL,
-                variable=var,
-                command=lambda val, idx=i: self.on_slider_change(idx, float(val)))
-            
-            label = tk.Label(self.sliders_frame, text=f'Component {i+1}:')
-            
-            label.grid(row=i, column=0, sticky=tk.W)
-            slider.grid(row=i, column=1, sticky=tk.EW)
-            
-            self.sliders.append(slider)
-            self.slider_vars.append(var)
-        
-        self.sliders_frame.columnconfigure(1, weight=1)
+        self.panel = ComponentSliderPanel(
+            self.sliders_frame,
+            self.current_components,
+            self.model.coef_min[:self.n_sliders],
+            self.model.coef_max[:self.n_sliders],
+            self.on_slider_change,
+            rows=self.visible_rows)
+        self.panel.frame.pack(side=tk.TOP, fill=tk.X)
         
+        buttons = tk.Frame(self.sliders_frame)
+        buttons.pack(side=tk.TOP, pady=10)
         self.btn_reset = tk.Button(
-            self.sliders_frame,
+            buttons,
             text="Reset",
             command=self.reset_sliders)
-        self.btn_reset.grid(row=5, column=0, columnspan=2, pady=10)
+        self.btn_reset.pack(side=tk.LEFT, padx=5)
+        self.btn_random = tk.Button(
+            buttons,
+            text="Randomize",
+            command=self.randomize_sliders)
+        self.btn_random.pack(side=tk.LEFT, padx=5)
+    
+    def on_draw(self, event):
+        # После полной перерисовки (в т.ч. при изменении размера окна) запоминаем
+        # фон без анимированных элементов и рисуем их поверх.
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.ax.draw_artist(self.img)
+        self.ax.draw_artist(self.title)
     
     def on_slider_change(self, component_idx, value):
-        self.current_components[component_idx] = value
+        # Изменения копятся до простоя цикла событий: все события ползунков,
+        # пришедшие за один проход, дают одно восстановление и одну отрисовку.
+        self.pending[component_idx] = value
+        if self._flush_id is None:
+            self._flush_id = self.root.after_idle(self.flush_updates)
+    
+    def flush_updates(self):
+        self._flush_id = None
+        if self.pending:
+            self.reconstructor.set_many(list(self.pending), list(self.pending.values()))
+            self.pending.clear()
         self.update_image()
     
     def update_image(self):
-        reconstructed_face = self.pca.inverse_transform(self.current_components).reshape(self.h, self.w)
-        self.img.set_array(reconstructed_face)
+        self.img.set_array(self.reconstructor.image)
         
-        components_text = ", ".join([f"{i+1}: {val:.1f}" for i, val in enumerate(self.current_components[:5])])
+        shown = self.current_components[:min(self.n_sliders, self.TITLE_COMPONENTS)]
+        components_text = ", ".join([f"{i+1}: {val:.1f}" for i, val in enumerate(shown)])
         self.title.set_text(f'PCA components: {components_text}')
         
-        self.canvas.draw()
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.img)
+        self.ax.draw_artist(self.title)
+        self.canvas.blit(Bbox.union([self.ax.bbox, self.title.get_window_extent()]))
     
     def reset_sliders(self):
-        for i in range(5):
-            self.slider_vars[i].set(0)
-            self.current_components[i] = 0
+        self.set_components(np.zeros(self.reconstructor.n_components))
+    
+    def randomize_sliders(self):
+        coef = np.zeros(self.reconstructor.n_components)
+        coef[:self.n_sliders] = np.clip(self.rng.standard_normal(self.n_sliders),
+                                        self.model.coef_min[:self.n_sliders],
+                                        self.model.coef_max[:self.n_sliders])
+        self.set_components(coef)
+    
+    def set_components(self, coef):
+        self.pending.clear()
+        self.reconstructor.reset(coef)
+        self.panel.refresh()
         self.update_image()
     
     def on_close(self):
+        if self._flush_id is not None:
+            self.root.after_cancel(self._flush_id)
         plt.close(self.fig)
         self.root.destroy()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Face Reconstruction with PCA")
+    parser.add_argument("--faces", help="локальный .npy/.npz с изображениями (n, h, w) вместо Olivetti")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="каталог кэша модели и данных")
+    parser.add_argument("--components", type=int, default=150)
+    parser.add_argument("--solver", choices=("full", "randomized", "incremental"), default="full",
+                        help="incremental читает изображения батчами из memmap (для больших корпусов)")
+    parser.add_argument("--batch-size", type=int, help="размер батча для --solver incremental")
+    parser.add_argument("--sliders", type=int, default=5, help="сколько компонент можно менять ползунками")
+    parser.add_argument("--visible-rows", type=int, default=8, help="сколько ползунков видно без прокрутки")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = FacePCAApp(root)
+    app = FacePCAApp(root, args.faces, args.cache_dir, args.components, args.solver, args.batch_size,
+                     args.sliders, args.visible_rows)
     root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
\ No newline at end of file
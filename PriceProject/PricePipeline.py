@@ -0,0 +1,539 @@
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from PriceSchema import PriceSchema, read_prices
+
+# Конвейер предсказания цен на дома, разбитый на этапы: загрузка, очистка
+# целевой переменной, обученная предобработка (медианы и one-hot по словарям
+# обучающей выборки), обучение RidgeCV + XGBoost и запись submission.csv.
+# EDA (текст и графики) строится отдельно и только по запросу - см.
+# PriceReport.py и --report; функции графиков остаются здесь.
+# matplotlib, seaborn, scipy и xgboost импортируются внутри этапов, которым
+# они нужны, поэтому без --report графическая часть не загружается вовсе.
+HERE = os.path.dirname(os.path.abspath(__file__))
+TARGET = 'SalePrice'
+RIDGE_ALPHAS = (0.01, 0.05, 0.1, 0.3, 1, 3, 5, 10)
+XGB_PARAMS = {'n_estimators': 340, 'max_depth': 2, 'learning_rate': 0.2}
+
+# Порядковые шкалы из data_description.txt, от худшего к лучшему; NA ("нет
+# подвала", "нет гаража" и т.п.) и неизвестные значения кодируются нулём.
+QUALITY_SCALE = ('Po', 'Fa', 'TA', 'Gd', 'Ex')
+ORDINAL_SCALES = {
+    'ExterQual': QUALITY_SCALE,
+    'ExterCond': QUALITY_SCALE,
+    'BsmtQual': QUALITY_SCALE,
+    'BsmtCond': QUALITY_SCALE,
+    'BsmtExposure': ('No', 'Mn', 'Av', 'Gd'),
+    'BsmtFinType1': ('Unf', 'LwQ', 'Rec', 'BLQ', 'ALQ', 'GLQ'),
+    'BsmtFinType2': ('Unf', 'LwQ', 'Rec', 'BLQ', 'ALQ', 'GLQ'),
+    'HeatingQC': QUALITY_SCALE,
+    'KitchenQual': QUALITY_SCALE,
+    'Functional': ('Sal', 'Sev', 'Maj2', 'Maj1', 'Mod', 'Min2', 'Min1', 'Typ'),
+    'FireplaceQu': QUALITY_SCALE,
+    'GarageFinish': ('Unf', 'RFn', 'Fin'),
+    'GarageQual': QUALITY_SCALE,
+    'GarageCond': QUALITY_SCALE,
+    'PoolQC': QUALITY_SCALE,
+}
+# Пропуски, заполняемые медианой внутри группы: длина фасада участка почти
+# целиком определяется районом застройки.
+GROUP_IMPUTE = {'LotFrontage': 'Neighborhood'}
+
+
+class StageTimer:
+    def __init__(self, log=None):
+        self.timings = {}
+        self.log = log
+
+    @contextmanager
+    def __call__(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            if self.log:
+                self.log(f"[{name}] {elapsed:.3f} s")
+
+    def report(self):
+        total = sum(self.timings.values())
+        lines = [f"{name:<20} {elapsed:8.3f} s  {elapsed / total * 100 if total else 0:5.1f}%"
+                 for name, elapsed in self.timings.items()]
+        lines.append(f"{'total':<20} {total:8.3f} s")
+        return "\n".join(lines)
+
+
+def load_data(train_path, test_path, cache_dir=None):
+    # Типы и смысл "NA" по столбцам задаёт схема из data_description.txt.
+    schema = PriceSchema()
+    return read_prices(train_path, schema, cache_dir), read_prices(test_path, schema, cache_dir)
+
+
+def plot_target(df_train):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from scipy import stats
+
+    sns.displot(df_train[TARGET])
+
+    fig = plt.figure(figsize = (14,8))
+    fig.add_subplot(1,2,1)
+    stats.probplot(df_train[TARGET], plot=plt)
+    fig.add_subplot(1,2,2)
+    stats.probplot(np.log1p(df_train[TARGET]), plot=plt)
+
+
+def log_target(df_train):
+    df_train[TARGET] = np.log1p(df_train[TARGET])
+    return df_train
+
+
+def top_correlated(df_train, k=10):
+    # k столбцов с наибольшей корреляцией с ценой (сама цена первая); нужен
+    # только столбец корреляций с целью, а не вся матрица.
+    return df_train.corrwith(df_train[TARGET], numeric_only=True).nlargest(k).index
+
+
+def plot_correlations(df_train, k=10):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # k - количество коррелирующих признаков, которое мы хотим увидеть
+    cols = top_correlated(df_train, k)
+    cm = np.corrcoef(df_train[cols].values.T)
+    plt.subplots(figsize=(12, 9))
+    sns.set(font_scale=1.25)
+    sns.heatmap(cm, cbar=True, annot=True, square=True,
+                fmt='.2f', annot_kws={'size': 10},
+                yticklabels=cols.values, xticklabels=cols.values)
+
+
+def plot_outliers(df_train):
+    import matplotlib.pyplot as plt
+
+    for column in ('GrLivArea', 'OverallQual'):
+        fig, ax = plt.subplots()
+        ax.scatter(x = df_train[column], y = df_train[TARGET])
+        plt.ylabel(TARGET, fontsize=13)
+        plt.xlabel(column, fontsize=13)
+
+
+def remove_outliers(df_train):
+    # Пороги цены заданы в долларах, а цель к этому моменту уже в log1p.
+    df_train = df_train.drop(df_train[(df_train['OverallQual'] > 9) & (df_train[TARGET] < np.log1p(220000))].index)
+    df_train = df_train.drop(df_train[(df_train['GrLivArea'] > 4000) & (df_train[TARGET] < np.log1p(300000))].index)
+    return df_train.dropna(axis=0, subset=[TARGET])
+
+
+def missingValuesInfo(df):
+    total = df.isnull().sum()
+    temp = pd.DataFrame({'Total': total, 'Percent': round(total / len(df) * 100, 2)})
+    return temp.loc[temp['Total'] > 0].sort_values('Total', ascending=False)
+
+
+def plot_missing(df_train):
+    import matplotlib.pyplot as plt
+
+    percent = (df_train.isnull().sum() / len(df_train)).sort_values(ascending=False)
+    percent.head(20).plot(kind="bar", figsize = (8,6), fontsize = 10)
+    plt.xlabel("Столбцы", fontsize = 20)
+    plt.ylabel("Count", fontsize = 20)
+    plt.title("Общее количество недостающих значений  (%)", fontsize = 20)
+
+
+def category_codes(values, categories):
+    # Номера значений в словаре categories, -1 для пропусков и значений вне
+    # словаря (pd.Categorical с чужими значениями в pandas 3 устарел).
+    categories = pd.Index(categories)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        lookup = np.append(categories.get_indexer(values.cat.categories), -1)
+        return lookup[values.cat.codes.to_numpy()]
+    return categories.get_indexer(values)
+
+
+def getObjectColumnsList(df):
+    # В pandas 3 текстовые столбцы читаются как str, а не object.
+    return [cname for cname in df.columns if not is_numeric_dtype(df[cname])]
+
+
+class PriceImputer:
+    # Статистики для заполнения пропусков числовых столбцов, посчитанные
+    # только на обучающей выборке: медианы одним nanmedian по матрице и
+    # медианы по группам (GROUP_IMPUTE; группа, которой не было при обучении,
+    # получает общую медиану). Пропуск категории не заполняется - в
+    # PricePreprocessor это отдельное значение ('UNKNOWN'). Число пропусков по
+    # столбцам запоминается как метрика: missing_counts - в обучающей выборке
+    # (и для категориальных), imputed - сколько значений заполнено во всех
+    # последующих вызовах.
+    def __init__(self, groups=GROUP_IMPUTE):
+        self.groups = dict(groups or {})
+
+    def fit(self, df, num_cols=None):
+        if num_cols is None:
+            num_cols = [c for c in df.columns if is_numeric_dtype(df[c]) and c not in ('Id', TARGET)]
+        self.num_cols = list(num_cols)
+        self.cat_cols = [c for c in getObjectColumnsList(df) if c not in ('Id', TARGET)]
+        values = df[self.num_cols].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        with warnings.catch_warnings():
+            # Столбец из одних пропусков: медиана NaN, заполняем нулём.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            self.medians = np.nan_to_num(np.nanmedian(values, axis=0)) if len(values) else np.zeros(len(self.num_cols))
+        self.index = {c: k for k, c in enumerate(self.num_cols)}
+        self.group_medians = {}
+        for c, key in self.groups.items():
+            if c in self.index and key in df.columns:
+                medians = df.groupby(key, observed=True, sort=False)[c].median().dropna()
+                self.group_medians[c] = (key, pd.Index(medians.index.astype(object)), medians.to_numpy(np.float64))
+        self.missing_counts = dict(zip(self.num_cols, missing.sum(axis=0).tolist()))
+        self.missing_counts.update((c, int(df[c].isna().sum())) for c in self.cat_cols)
+        self.imputed = np.zeros(len(self.num_cols), dtype=np.int64)
+        return self
+
+    def _group_values(self, c, keys):
+        key, groups, medians = self.group_medians[c]
+        pos = groups.get_indexer(np.asarray(keys, dtype=object))
+        return np.where(pos >= 0, medians[pos], self.medians[self.index[c]])
+
+    def fill(self, values, df):
+        # Заполнение на месте матрицы df[num_cols] (float64, строки df);
+        # из самой таблицы читаются только столбцы групп. Матрица только для
+        # чтения (столбцы из кэша read_prices отображены в память) копируется.
+        if not values.flags.writeable:
+            values = values.copy()
+        missing = np.isnan(values)
+        self.imputed += missing.sum(axis=0)
+        for c, (key, _, _) in self.group_medians.items():
+            j = self.index[c]
+            rows = np.flatnonzero(missing[:, j])
+            if len(rows):
+                values[rows, j] = self._group_values(c, df[key].to_numpy()[rows])
+                missing[rows, j] = False
+        values[missing] = np.broadcast_to(self.medians, values.shape)[missing]
+        return values
+
+    def fill_value(self, c, record):
+        if c in self.group_medians:
+            return self._group_values(c, [record.get(self.group_medians[c][0])])[0]
+        return self.medians[self.index[c]]
+
+    def metrics(self):
+        return {'train_missing': {c: n for c, n in self.missing_counts.items() if n},
+                'imputed': {c: int(n) for c, n in zip(self.num_cols, self.imputed) if n}}
+
+
+class PricePreprocessor:
+    # Обученная предобработка: статистики пропусков (PriceImputer) и словари
+    # категорий запоминаются на обучающей выборке, новые строки раскладываются в ту же
+    # фиксированную матрицу признаков, что и при обучении: числовые столбцы,
+    # порядковые коды шкал качества (ORDINAL_SCALES, 0 - нет/пропуск), затем
+    # one-hot в порядке pd.get_dummies. Пропуск категории - отдельное значение
+    # 'UNKNOWN', как было в прежнем скрипте; категории, которых не было при
+    # обучении, дают нулевой one-hot.
+    #
+    # По умолчанию результат - CSR float32: one-hot блоки почти целиком из
+    # нулей, а плотная float64 матрица на миллионах объявлений не помещается
+    # в память. Таблица кодируется блоками по chunk_rows строк. XGBoost
+    # считает отсутствующие в CSR элементы пропусками, а не нулями, поэтому
+    # модель, обученная на разреженной матрице, и в одиночном пути получает
+    # нули как NaN (см. PriceModel.predict_record).
+    MISSING = 'UNKNOWN'
+
+    def __init__(self, sparse=True, ordinal=True, dtype=np.float32, chunk_rows=65536, imputer=None):
+        self.sparse = sparse
+        self.ordinal = ordinal
+        self.dtype = dtype
+        self.chunk_rows = chunk_rows
+        self.imputer = imputer if imputer is not None else PriceImputer()
+
+    def fit(self, df):
+        df = df.drop(columns=[c for c in ('Id', TARGET) if c in df.columns])
+        self.num_cols = [c for c in df.columns if is_numeric_dtype(df[c])]
+        self.ord_cols = [c for c in ORDINAL_SCALES if c in df.columns] if self.ordinal else []
+        self.cat_cols = [c for c in getObjectColumnsList(df) if c not in self.ord_cols]
+        self.imputer.fit(df, self.num_cols)
+        self.vocab = {c: sorted(df[c].astype(object).fillna(self.MISSING).unique()) for c in self.cat_cols}
+        self.ord_codes = {c: {value: k + 1 for k, value in enumerate(ORDINAL_SCALES[c])} for c in self.ord_cols}
+
+        self.feature_names = self.num_cols + self.ord_cols
+        self.n_dense = len(self.feature_names)
+        self.offsets = {}
+        self.starts = {}
+        for c in self.cat_cols:
+            start = self.starts[c] = len(self.feature_names)
+            self.offsets[c] = {value: start + k for k, value in enumerate(self.vocab[c])}
+            self.feature_names = self.feature_names + [f"{c}_{value}" for value in self.vocab[c]]
+        self.n_features = len(self.feature_names)
+        self._fill = np.zeros(self.n_features)
+        self._fill[:len(self.num_cols)] = self.imputer.medians
+        self._grouped = set(self.imputer.group_medians)
+        self._row = np.empty((1, self.n_features))
+        return self
+
+    def _dense_block(self, df):
+        out = np.empty((len(df), self.n_dense), dtype=self.dtype)
+        out[:, :len(self.num_cols)] = self.imputer.fill(df[self.num_cols].to_numpy(dtype=np.float64), df)
+        for k, c in enumerate(self.ord_cols, start=len(self.num_cols)):
+            out[:, k] = category_codes(df[c], ORDINAL_SCALES[c]) + 1
+        return out
+
+    def _one_hot(self, df):
+        for c in self.cat_cols:
+            values = df[c]
+            codes = category_codes(values, self.vocab[c])
+            missing = self.offsets[c].get(self.MISSING)
+            if missing is not None:
+                codes[values.isna().to_numpy()] = missing - self.starts[c]
+            yield c, codes
+
+    def _csr_block(self, df):
+        # В каждой строке не больше n_dense + len(cat_cols) ненулевых: плотная
+        # часть и по одной единице на категориальный столбец. Значения и
+        # номера столбцов собираются в матрицы такой ширины, нули выбрасываются
+        # маской; столбцы в строке уже идут по возрастанию, сортировка не нужна.
+        n = len(df)
+        width = self.n_dense + len(self.cat_cols)
+        values = np.zeros((n, width), dtype=self.dtype)
+        columns = np.empty((n, width), dtype=np.int32)
+        values[:, :self.n_dense] = self._dense_block(df)
+        columns[:, :self.n_dense] = np.arange(self.n_dense)
+        for k, (c, codes) in enumerate(self._one_hot(df), start=self.n_dense):
+            values[:, k] = codes >= 0
+            columns[:, k] = self.starts[c] + codes
+        mask = values != 0
+        return values[mask], columns[mask], np.count_nonzero(mask, axis=1)
+
+    def transform(self, df):
+        if not self.sparse:
+            out = np.zeros((len(df), self.n_features), dtype=self.dtype)
+            out[:, :self.n_dense] = self._dense_block(df)
+            rows = np.arange(len(df))
+            for c, codes in self._one_hot(df):
+                known = codes >= 0
+                out[rows[known], self.starts[c] + codes[known]] = 1
+            return out
+
+        from scipy import sparse
+        data, indices, counts = [], [], []
+        for start in range(0, len(df), self.chunk_rows):
+            block = self._csr_block(df.iloc[start:start + self.chunk_rows])
+            data.append(block[0])
+            indices.append(block[1])
+            counts.append(block[2])
+        data = np.concatenate(data) if data else np.empty(0, dtype=self.dtype)
+        indices = np.concatenate(indices) if indices else np.empty(0, dtype=np.int32)
+        indptr = np.zeros(len(df) + 1, dtype=np.int64 if len(data) >= 2 ** 31 else np.int32)
+        if counts:
+            np.cumsum(np.concatenate(counts), out=indptr[1:])
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(df), self.n_features))
+
+    def transform_record(self, record):
+        # Одна запись (dict) в заранее выделенную строку (1, n_features);
+        # строка переиспользуется следующим вызовом.
+        row = self._row[0]
+        row[:] = self._fill
+        for k, c in enumerate(self.num_cols):
+            value = record.get(c)
+            if value is not None and value == value:
+                row[k] = value
+            elif c in self._grouped:
+                row[k] = self.imputer.fill_value(c, record)
+        for k, c in enumerate(self.ord_cols, start=len(self.num_cols)):
+            row[k] = self.ord_codes[c].get(record.get(c), 0)
+        for c, offsets in self.offsets.items():
+            value = record.get(c)
+            if value is None or value != value:
+                value = self.MISSING
+            pos = offsets.get(value)
+            if pos is not None:
+                row[pos] = 1.0
+        return self._row
+
+
+class PriceModel:
+    # Предобработка + смесь RidgeCV и XGBRegressor с двумя путями предсказания:
+    # predict для таблицы и predict_record для одной записи. В одиночном
+    # пути ridge считается скалярным произведением, а бустинг - через
+    # Booster.inplace_predict, минуя проверки sklearn-обёрток.
+    def __init__(self, preprocessor, models, weights=None):
+        self.preprocessor = preprocessor
+        self.models = models
+        self.weights = np.asarray(weights if weights is not None else [1.0, 1.0], dtype=np.float64)
+        self.weights = self.weights / self.weights.sum()
+        ridge, model_xgb = models
+        self._coef = np.asarray(ridge.coef_, dtype=np.float64)
+        self._intercept = float(ridge.intercept_)
+        self._booster = model_xgb.get_booster()
+        self._zero_is_missing = preprocessor.sparse
+        self._booster_row = np.empty_like(preprocessor._row)
+
+    @classmethod
+    def fit(cls, df_train, selection=None, preprocessor=None):
+        preprocessor = (preprocessor or PricePreprocessor()).fit(df_train)
+        models = fit_models(preprocessor.transform(df_train), df_train[TARGET].to_numpy(), selection)
+        return cls(preprocessor, models, selection['weights'] if selection else None)
+
+    def predict(self, df):
+        return predict(self.models, self.preprocessor.transform(df), self.weights)
+
+    def predict_record(self, record):
+        row = self.preprocessor.transform_record(record)
+        ridge = row[0] @ self._coef + self._intercept
+        if self._zero_is_missing:
+            np.copyto(self._booster_row, row)
+            self._booster_row[self._booster_row == 0] = np.nan
+            row = self._booster_row
+        boosted = self._booster.inplace_predict(row)[0]
+        return float(np.expm1(self.weights[0] * ridge + self.weights[1] * boosted))
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def fit_models(X, y, selection=None):
+    # selection - результат PriceSelection (alpha ridge и параметры XGBoost);
+    # без него используются прежние фиксированные настройки.
+    import xgboost as xgb
+    from sklearn.linear_model import RidgeCV
+
+    alphas = [selection['ridge']['alpha']] if selection else RIDGE_ALPHAS
+    ridge_cv = RidgeCV(alphas = alphas)
+    ridge_cv.fit(X, y)
+    model_xgb = xgb.XGBRegressor(**(selection['xgb'] if selection else XGB_PARAMS))
+    model_xgb.fit(X, y)
+    return [ridge_cv, model_xgb]
+
+
+def predict(models, X, weights=None):
+    # Модели обучены на log1p(цены), в submission нужны доллары.
+    log_pred = np.average([model.predict(X) for model in models], axis=0, weights=weights)
+    return np.expm1(log_pred)
+
+
+def write_submission(ids, predictions, path):
+    pd.DataFrame({'Id': ids, TARGET: predictions}).to_csv(path, index=False)
+
+
+def score_stream(model, path, output, chunksize=100_000):
+    # Оценка большой выгрузки блоками: чтение, предобработка и предсказание
+    # идут по chunksize строк, в памяти одновременно только один блок.
+    rows = 0
+    with open(output, 'w', encoding='utf-8', newline='') as f:
+        for k, chunk in enumerate(PriceSchema().iter_chunks(path, chunksize)):
+            pd.DataFrame({'Id': chunk['Id'].to_numpy(), TARGET: model.predict(chunk)}).to_csv(
+                f, index=False, header=(k == 0))
+            rows += len(chunk)
+    return rows
+
+
+def run(train_path, test_path, output, report=None, timer=None, model_path=None, selection=None,
+        sparse=True, cache_dir=None, report_dir=None):
+    # report - список разделов PriceReport (None - без EDA).
+    timer = timer or StageTimer()
+    with timer("load"):
+        df_train, df_test = load_data(train_path, test_path, cache_dir)
+    eda = None
+    if report:
+        from PriceReport import DEFAULT_CACHE_DIR, build_report
+
+        with timer("report"):
+            eda = build_report(df_train, report, report_dir or DEFAULT_CACHE_DIR)
+    with timer("target"):
+        df_train = remove_outliers(log_target(df_train))
+    with timer("preprocess"):
+        preprocessor = PricePreprocessor(sparse=sparse).fit(df_train)
+        X, X_test = preprocessor.transform(df_train), preprocessor.transform(df_test)
+    with timer("fit"):
+        model = PriceModel(preprocessor, fit_models(X, df_train[TARGET].to_numpy(), selection),
+                           selection['weights'] if selection else None)
+    with timer("predict"):
+        predictions = predict(model.models, X_test, model.weights)
+        write_submission(df_test.Id.values, predictions, output)
+    if model_path:
+        with timer("save model"):
+            model.save(model_path)
+    return {'model': model, 'predictions': predictions, 'timings': timer.timings,
+            'missing': preprocessor.imputer.metrics(), 'report': eda}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Обучение моделей цен на дома и запись submission.csv")
+    parser.add_argument("--train", default=os.path.join(HERE, 'train.csv'))
+    parser.add_argument("--test", default=os.path.join(HERE, 'test.csv'))
+    parser.add_argument("-o", "--output", default=os.path.join(HERE, 'submission.csv'))
+    parser.add_argument("--selection", help="JSON из PriceSelection.py: параметры моделей и веса смеси")
+    parser.add_argument("--save-model", help="сохранить обученную предобработку и модели (pickle) для predict_record")
+    parser.add_argument("--dense", action="store_true", help="плотная матрица признаков вместо CSR")
+    parser.add_argument("--data-cache", help="каталог кэша разобранных CSV (Parquet или .npy)")
+    parser.add_argument("--score", metavar="CSV", help="только оценить выгрузку блоками моделью из --model")
+    parser.add_argument("--model", help="модель, сохранённая через --save-model")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--report", nargs="?", const="", metavar="SECTIONS",
+                        help="построить отчёт EDA: разделы PriceReport.py через запятую (без значения - все)")
+    parser.add_argument("--report-dir", help="каталог кэша отчёта EDA")
+    # Графики больше не строятся по умолчанию; флаг принимается ради старых
+    # скриптов запуска, но только с предупреждением.
+    parser.add_argument("--no-plots", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.no_plots:
+        print("warning: --no-plots is deprecated and has no effect: plots are drawn only with --report",
+              file=sys.stderr)
+
+    report = None
+    if args.report is not None:
+        from PriceReport import SECTIONS
+
+        report = [section for section in args.report.split(",") if section] or list(SECTIONS)
+        unknown = sorted(set(report) - set(SECTIONS))
+        if unknown:
+            parser.error(f"unknown report sections: {', '.join(unknown)} (expected {', '.join(SECTIONS)})")
+
+    if args.score:
+        if not args.model:
+            parser.error("--score requires --model")
+        t0 = time.perf_counter()
+        rows = score_stream(PriceModel.load(args.model), args.score, args.output, args.chunk_size)
+        elapsed = time.perf_counter() - t0
+        print(f"scored {rows} rows in {elapsed:.2f} s ({rows / elapsed:.0f} rows/s)", file=sys.stderr)
+        return 0
+
+    selection = None
+    if args.selection:
+        with open(args.selection, encoding='utf-8') as f:
+            selection = json.load(f)
+    timer = StageTimer(log=lambda msg: print(msg, file=sys.stderr))
+    result = run(args.train, args.test, args.output, report=report, timer=timer, model_path=args.save_model,
+                 selection=selection, sparse=not args.dense, cache_dir=args.data_cache, report_dir=args.report_dir)
+    if result['report']:
+        from PriceReport import format_report
+
+        print(format_report(result['report']))
+    imputed = result['missing']['imputed']
+    print(f"imputed {sum(imputed.values())} numeric values in {len(imputed)} columns: "
+          + ", ".join(f"{c}={n}" for c, n in imputed.items()), file=sys.stderr)
+    print(timer.report(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    # Запуск через импортированный модуль: модель из --save-model ссылается
+    # на классы PricePipeline, а не __main__, и загружается в любом процессе.
+    import PricePipeline
+    sys.exit(PricePipeline.main())
@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
+import numpy as np
+
+from PricePipeline import (HERE, TARGET, log_target, missingValuesInfo, plot_correlations,
+                           plot_missing, plot_outliers, plot_target, remove_outliers, top_correlated)
+from PriceSchema import frame_hash, read_prices
+
+# Отчёт EDA по обучающей выборке, который прежде строился при каждом запуске
+# Prices.py. Разделы считаются лениво - только запрошенные; статистика
+# каждого раздела и его графики сохраняются в каталоге кэша под отпечатком
+# таблицы (eda-<hash>), так что повторный запуск на тех же данных только
+# читает JSON. Графики рисуются без экрана (Agg) в пуле процессов, по
+# процессу на раздел, и записываются в PNG рядом со статистикой.
+DEFAULT_CACHE_DIR = os.environ.get("PRICE_REPORT_CACHE",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "price_report"))
+SECTIONS = ('summary', 'correlations', 'outliers', 'missing')
+# Таблица, по которой строится раздел: исходная, с log1p(цены) или уже без
+# выбросов - как в прежнем скрипте.
+FRAMES = {'summary': 'raw', 'correlations': 'logged', 'outliers': 'logged', 'missing': 'cleaned'}
+PLOTS = {'summary': plot_target, 'correlations': plot_correlations, 'outliers': plot_outliers,
+         'missing': plot_missing}
+
+
+def render_figures(section, df, directory, k=10, name=None):
+    # Выполняется в процессе пула; сохраняются и закрываются только фигуры,
+    # созданные этим вызовом.
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    before = set(plt.get_fignums())
+    if section == 'correlations':
+        plot_correlations(df, k)
+    else:
+        PLOTS[section](df)
+    paths = []
+    for n, num in enumerate(num for num in plt.get_fignums() if num not in before):
+        path = os.path.join(directory, f"{name or section}-{n}.png")
+        tmp = path + f".tmp-{os.getpid()}.png"
+        fig = plt.figure(num)
+        fig.savefig(tmp, dpi=80, bbox_inches='tight')
+        plt.close(fig)
+        os.replace(tmp, path)
+        paths.append(path)
+    return paths
+
+
+class EDAReport:
+    def __init__(self, df_train, cache_dir=DEFAULT_CACHE_DIR, k=10):
+        self.df = df_train
+        self.k = k
+        self.directory = os.path.join(cache_dir, f"eda-{frame_hash(df_train)}")
+
+    # Производные таблицы строятся только для разделов, которым они нужны.
+    @cached_property
+    def logged(self):
+        return log_target(self.df.copy())
+
+    @cached_property
+    def cleaned(self):
+        return remove_outliers(self.logged)
+
+    def frame(self, section):
+        return self.df if FRAMES[section] == 'raw' else getattr(self, FRAMES[section])
+
+    def _name(self, section):
+        return f"{section}-k{self.k}" if section == 'correlations' else section
+
+    def _path(self, section, suffix):
+        return os.path.join(self.directory, f"{self._name(section)}.{suffix}.json")
+
+    def _read(self, section, suffix):
+        path = self._path(section, suffix)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write(self, section, suffix, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(section, suffix)
+        tmp = path + f".tmp-{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    def _compute(self, section):
+        df = self.frame(section)
+        if section == 'summary':
+            target = df[TARGET]
+            return {'rows': len(df), 'columns': df.shape[1],
+                    'target': {name: float(value) for name, value in target.describe().items()},
+                    'skew': float(target.skew()), 'kurtosis': float(target.kurt()),
+                    'log_skew': float(np.log1p(target).skew())}
+        if section == 'correlations':
+            cols = top_correlated(df, self.k)
+            cm = np.corrcoef(df[cols].to_numpy(dtype=np.float64).T)
+            return {'columns': list(cols), 'matrix': np.round(cm, 6).tolist()}
+        if section == 'outliers':
+            removed = len(df) - len(self.cleaned)
+            return {'rows': len(df), 'removed': removed,
+                    'GrLivArea_max': float(df['GrLivArea'].max()), 'OverallQual_max': float(df['OverallQual'].max())}
+        info = missingValuesInfo(df)
+        return {name: {'total': int(row.Total), 'percent': float(row.Percent)} for name, row in info.iterrows()}
+
+    def stats(self, section):
+        cached = self._read(section, 'stats')
+        if cached is None:
+            cached = self._compute(section)
+            self._write(section, 'stats', cached)
+        return cached
+
+    def figures(self, sections, workers=None):
+        # Пути к PNG по разделам; отсутствующие рисуются параллельно.
+        result, missing = {}, []
+        for section in sections:
+            paths = self._read(section, 'figures')
+            if paths is not None and all(os.path.exists(path) for path in paths):
+                result[section] = paths
+            else:
+                missing.append(section)
+        if not missing:
+            return result
+        os.makedirs(self.directory, exist_ok=True)
+        args = [(section, self.frame(section), self.directory, self.k, self._name(section)) for section in missing]
+        if workers == 1 or len(missing) == 1:
+            rendered = [render_figures(*arg) for arg in args]
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count(), len(missing))) as pool:
+                rendered = list(pool.map(render_figures, *zip(*args)))
+        for section, paths in zip(missing, rendered):
+            self._write(section, 'figures', paths)
+            result[section] = paths
+        return result
+
+
+def build_report(df_train, sections=SECTIONS, cache_dir=DEFAULT_CACHE_DIR, figures=True, workers=None, k=10):
+    report = EDAReport(df_train, cache_dir, k)
+    result = {'fingerprint': os.path.basename(report.directory), 'directory': report.directory,
+              'sections': {section: report.stats(section) for section in sections}}
+    if figures:
+        result['figures'] = report.figures(sections, workers)
+    return result
+
+
+def format_report(result):
+    sections = result['sections']
+    lines = []
+    if 'summary' in sections:
+        s = sections['summary']
+        lines.append(f"{s['rows']} rows x {s['columns']} columns")
+        lines.append(", ".join(f"{name}={value:.1f}" for name, value in s['target'].items()))
+        lines.append(f"Ассиметрия: {s['skew']:f} (после log1p {s['log_skew']:f})")
+        lines.append(f"Эксцесс: {s['kurtosis']:f}")
+    if 'correlations' in sections:
+        s = sections['correlations']
+        lines.append("Корреляция с ценой: " + ", ".join(
+            f"{name} {value:.2f}" for name, value in zip(s['columns'], s['matrix'][0])))
+    if 'outliers' in sections:
+        s = sections['outliers']
+        lines.append(f"Выбросы: удалено {s['removed']} из {s['rows']} строк")
+    if 'missing' in sections:
+        lines.append("Пропуски: " + ", ".join(
+            f"{name} {value['total']} ({value['percent']}%)" for name, value in sections['missing'].items()))
+    for section, paths in result.get('figures', {}).items():
+        lines.append(f"{section}: " + " ".join(paths))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Отчёт EDA по обучающей выборке с кэшем и графиками в PNG")
+    parser.add_argument("--train", default=os.path.join(HERE, 'train.csv'))
+    parser.add_argument("--sections", default=",".join(SECTIONS),
+                        help="разделы через запятую: " + ", ".join(SECTIONS))
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--no-figures", action="store_true", help="только статистика, без графиков")
+    parser.add_argument("-k", type=int, default=10, help="число признаков в матрице корреляций")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output", help="записать отчёт в JSON")
+    args = parser.parse_args(argv)
+
+    sections = [s for s in args.sections.split(",") if s]
+    unknown = sorted(set(sections) - set(SECTIONS))
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(unknown)}")
+    t0 = time.perf_counter()
+    df_train = read_prices(args.train)
+    t_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    result = build_report(df_train, sections, args.cache_dir, not args.no_figures, args.workers, args.k)
+    t_report = time.perf_counter() - t0
+    print(format_report(result))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"load {t_load:.3f} s, report {t_report:.3f} s ({result['directory']})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Схема данных о продажах домов, построенная по data_description.txt.
+# Для каждого столбца описания известны его уровни; столбец без уровней или с
+# одними числовыми кодами (MSSubClass, OverallQual) - числовой, остальные -
+# категориальные. Если среди уровней есть "NA" ("No alley access", "No
+# Garage"), это значение - полноценная категория "нет", а не пропуск: при
+# чтении оно остаётся строкой 'NA'. В остальных столбцах "NA" и пустая ячейка
+# означают пропуск.
+#
+# Числовые признаки читаются как float32 (все значения в данных - целые или
+# с точностью до единиц, float32 хранит их точно и вдвое компактнее int64),
+# категориальные - как category. Большие выгрузки читаются блоками через
+# iter_chunks; разобранная таблица кэшируется в Parquet, если установлен
+# pyarrow, иначе - набором .npy по столбцам (коды категорий + словари).
+HERE = os.path.dirname(os.path.abspath(__file__))
+DESCRIPTION = os.path.join(HERE, 'data_description.txt')
+DEFAULT_CACHE_DIR = os.environ.get("PRICE_DATA_CACHE",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "price_data"))
+# Имена в описании, отличающиеся от заголовков CSV.
+COLUMN_ALIASES = {'Bedroom': 'BedroomAbvGr', 'Kitchen': 'KitchenAbvGr'}
+EXTRA_DTYPES = {'Id': 'int64', 'SalePrice': 'float64'}
+NUMERIC_DTYPE = 'float32'
+
+_HEADER = re.compile(r'^(\w+):\s*(.*?)\s*$')
+
+
+class ColumnSpec:
+    def __init__(self, name, description, levels):
+        self.name = name
+        self.description = description
+        self.levels = levels
+
+    @property
+    def numeric(self):
+        return not self.levels or all(re.fullmatch(r'\d+(\.\d+)?', code) for code in self.levels)
+
+    @property
+    def na_is_level(self):
+        return 'NA' in self.levels
+
+    @property
+    def dtype(self):
+        return NUMERIC_DTYPE if self.numeric else 'category'
+
+    @property
+    def na_values(self):
+        return [''] if self.na_is_level else ['', 'NA']
+
+    def as_dict(self):
+        return {'description': self.description, 'dtype': self.dtype,
+                'na_is_level': self.na_is_level, 'levels': self.levels}
+
+
+def parse_description(path=DESCRIPTION):
+    columns = {}
+    current = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            header = _HEADER.match(line)
+            if header and not line[0].isspace():
+                name = COLUMN_ALIASES.get(header.group(1), header.group(1))
+                current = columns[name] = ColumnSpec(name, header.group(2), {})
+                continue
+            parts = line.strip().split('\t', 1)
+            if current is not None and len(parts) == 2 and parts[0].strip():
+                current.levels[parts[0].strip()] = parts[1].strip()
+    return columns
+
+
+class PriceSchema:
+    def __init__(self, path=DESCRIPTION):
+        self.path = path
+        self.columns = parse_description(path)
+
+    def fingerprint(self):
+        payload = json.dumps({name: spec.as_dict() for name, spec in self.columns.items()}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def read_options(self, header, categorical='category'):
+        # Параметры pd.read_csv для файла с заданным заголовком: явные типы и
+        # свои значения пропуска для каждого столбца. Столбцы вне описания,
+        # кроме Id/SalePrice, оставляются на выбор pandas.
+        dtype, na_values = {}, {}
+        for name in header:
+            spec = self.columns.get(name)
+            if spec is not None:
+                dtype[name] = spec.dtype if spec.numeric else categorical
+                na_values[name] = spec.na_values
+            elif name in EXTRA_DTYPES:
+                dtype[name] = EXTRA_DTYPES[name]
+                na_values[name] = ['', 'NA']
+        return {'dtype': dtype, 'na_values': na_values, 'keep_default_na': False}
+
+    def read(self, path):
+        header = pd.read_csv(path, nrows=0).columns
+        return pd.read_csv(path, **self.read_options(header))
+
+    def iter_chunks(self, path, chunksize=100_000):
+        # Блоки с категориальными столбцами в виде строк: словари категорий у
+        # разных блоков разные, и приводить их к category имеет смысл только
+        # для целой таблицы.
+        header = pd.read_csv(path, nrows=0).columns
+        yield from pd.read_csv(path, chunksize=chunksize, **self.read_options(header, 'str'))
+
+
+def frame_hash(df):
+    # Отпечаток содержимого таблицы - ключ кэшей, построенных по ней (фолды
+    # PriceSelection, отчёт PriceReport).
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def _have_parquet():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _save_npy(df, directory):
+    tmp = directory + f".tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    meta = {'columns': [], 'rows': len(df)}
+    for k, name in enumerate(df.columns):
+        column = df[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(tmp, f"{k}.npy"), column.cat.codes.to_numpy())
+            meta['columns'].append({'name': name, 'categories': column.cat.categories.tolist()})
+        else:
+            np.save(os.path.join(tmp, f"{k}.npy"), column.to_numpy())
+            meta['columns'].append({'name': name})
+    with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        pass
+
+
+def _load_npy(directory):
+    with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    data = {}
+    for k, column in enumerate(meta['columns']):
+        values = np.load(os.path.join(directory, f"{k}.npy"), mmap_mode='r')
+        if 'categories' in column:
+            data[column['name']] = pd.Categorical.from_codes(values, column['categories'])
+        else:
+            data[column['name']] = values
+    return pd.DataFrame(data)
+
+
+def read_prices(path, schema=None, cache_dir=None, cache_format='auto'):
+    # Чтение CSV по схеме; с cache_dir разобранная таблица сохраняется и при
+    # следующем вызове берётся из кэша. Ключ - путь, размер и время изменения
+    # файла плюс отпечаток схемы.
+    schema = schema or PriceSchema()
+    if cache_dir is None:
+        return schema.read(path)
+    if cache_format == 'auto':
+        cache_format = 'parquet' if _have_parquet() else 'npy'
+    stat = os.stat(path)
+    key = hashlib.sha256(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{schema.fingerprint()}"
+                         .encode()).hexdigest()[:16]
+    base = os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{key}")
+    if cache_format == 'parquet':
+        target = base + '.parquet'
+        if os.path.exists(target):
+            return pd.read_parquet(target)
+        df = schema.read(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = target + f".tmp-{os.getpid()}"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, target)
+        return df
+    if os.path.exists(os.path.join(base, 'meta.json')):
+        return _load_npy(base)
+    df = schema.read(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    _save_npy(df, base)
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Схема данных по data_description.txt и кэш разобранных CSV")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("describe", help="вывести схему (JSON)")
+    p.add_argument("--description", default=DESCRIPTION)
+    p = sub.add_parser("cache", help="разобрать CSV в кэш и сравнить время чтения")
+    p.add_argument("csv")
+    p.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    p.add_argument("--format", choices=("auto", "parquet", "npy"), default="auto")
+    args = parser.parse_args(argv)
+
+    if args.command == "describe":
+        schema = PriceSchema(args.description)
+        json.dump({name: spec.as_dict() for name, spec in schema.columns.items()}, sys.stdout,
+                  indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    schema = PriceSchema()
+    t0 = time.perf_counter()
+    pd.read_csv(args.csv)
+    t_default = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    df = schema.read(args.csv)
+    t_schema = time.perf_counter() - t0
+    read_prices(args.csv, schema, args.cache_dir, args.format)
+    t0 = time.perf_counter()
+    read_prices(args.csv, schema, args.cache_dir, args.format)
+    t_cached = time.perf_counter() - t0
+    print(f"{len(df)} rows: read_csv {t_default * 1e3:.1f} ms, schema read {t_schema * 1e3:.1f} ms, "
+          f"cached reload {t_cached * 1e3:.1f} ms")
+    print(f"memory: {df.memory_usage(deep=True).sum() / 2 ** 20:.2f} MiB with schema dtypes, "
+          f"{pd.read_csv(args.csv).memory_usage(deep=True).sum() / 2 ** 20:.2f} MiB inferred")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
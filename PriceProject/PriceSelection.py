@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from PricePipeline import GROUP_IMPUTE, HERE, TARGET, PricePreprocessor, load_data, log_target, remove_outliers
+from PriceSchema import frame_hash
+
+# Подбор параметров RidgeCV/XGBoost и весов смеси по k-fold кросс-валидации.
+# Разбиение на фолды и предобработанные матрицы (предобработка обучается на
+# обучающей части каждого фолда) считаются один раз и лежат в каталоге кэша
+# как .npy; задачи (кандидат, фолд) выполняются в пуле процессов и читают их
+# через memmap. XGBoost останавливается по отложенной доле обучающей части
+# фолда, сам валидационный фолд используется только для оценки. Веса смеси
+# подбираются по out-of-fold предсказаниям лучших кандидатов каждой модели.
+DEFAULT_CACHE_DIR = os.environ.get("PRICE_SELECTION_CACHE",
+                                   os.path.join(os.path.expanduser("~"), ".cache", "price_selection"))
+RIDGE_ALPHAS = (0.1, 0.3, 1, 3, 10, 30, 100)
+XGB_DEPTHS = (2, 3, 4)
+XGB_LEARNING_RATES = (0.05, 0.1, 0.2)
+MAX_ESTIMATORS = 3000
+EARLY_STOPPING_ROUNDS = 50
+EARLY_STOPPING_SHARE = 0.1
+
+
+def save_matrix(directory, name, X):
+    # CSR хранится тремя .npy (data, indices, indptr), чтобы и его можно было
+    # открыть через memmap, в отличие от save_npz.
+    if hasattr(X, "indptr"):
+        for part in ("data", "indices", "indptr"):
+            np.save(os.path.join(directory, f"{name}.{part}.npy"), getattr(X, part))
+        with open(os.path.join(directory, f"{name}.shape.json"), "w", encoding="utf-8") as f:
+            json.dump(X.shape, f)
+    else:
+        np.save(os.path.join(directory, name + ".npy"), X)
+
+
+def load_matrix(directory, name):
+    path = os.path.join(directory, name + ".npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+    from scipy import sparse
+    with open(os.path.join(directory, f"{name}.shape.json"), encoding="utf-8") as f:
+        shape = tuple(json.load(f))
+    parts = [np.load(os.path.join(directory, f"{name}.{part}.npy"), mmap_mode="r")
+             for part in ("data", "indices", "indptr")]
+    return sparse.csr_matrix(tuple(parts), shape=shape)
+
+
+def prepare_folds(df_train, k=5, seed=0, cache_dir=DEFAULT_CACHE_DIR, sparse=True):
+    # Заполнение пропусков по группам меняет признаки - оно тоже часть ключа.
+    layout = "csr" if sparse else "dense"
+    layout += "".join(f"-{c}.{key}" for c, key in sorted(GROUP_IMPUTE.items()))
+    directory = os.path.join(cache_dir, f"folds-{frame_hash(df_train)}-k{k}-s{seed}-{layout}")
+    if os.path.exists(os.path.join(directory, "meta.json")):
+        return directory
+
+    from sklearn.model_selection import KFold
+    tmp = directory + f".tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    np.save(os.path.join(tmp, "y.npy"), df_train[TARGET].to_numpy(dtype=np.float64))
+    features = []
+    for fold, (train_idx, val_idx) in enumerate(KFold(k, shuffle=True, random_state=seed).split(df_train)):
+        preprocessor = PricePreprocessor(sparse=sparse).fit(df_train.iloc[train_idx])
+        save_matrix(tmp, f"X-{fold}", preprocessor.transform(df_train))
+        np.save(os.path.join(tmp, f"train-{fold}.npy"), train_idx)
+        np.save(os.path.join(tmp, f"val-{fold}.npy"), val_idx)
+        features.append(preprocessor.n_features)
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"folds": k, "seed": seed, "rows": len(df_train), "features": features}, f, indent=2)
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        pass
+    return directory
+
+
+_folds = {}
+
+
+def _load_fold(directory, fold):
+    key = (directory, fold)
+    if key not in _folds:
+        def load(name):
+            return np.load(os.path.join(directory, name), mmap_mode="r")
+        X, y = load_matrix(directory, f"X-{fold}"), load("y.npy")
+        train_idx, val_idx = load(f"train-{fold}.npy"), load(f"val-{fold}.npy")
+        _folds[key] = (X[train_idx], y[train_idx], X[val_idx])
+    return _folds[key]
+
+
+def candidates(alphas=RIDGE_ALPHAS, depths=XGB_DEPTHS, learning_rates=XGB_LEARNING_RATES):
+    result = [{"model": "ridge", "alpha": float(a)} for a in alphas]
+    result += [{"model": "xgb", "max_depth": int(d), "learning_rate": float(lr)}
+               for d in depths for lr in learning_rates]
+    return result
+
+
+def evaluate(directory, index, candidate, fold, n_jobs=None):
+    started = time.time()
+    X_train, y_train, X_val = _load_fold(directory, fold)
+    extra = {}
+    if candidate["model"] == "ridge":
+        # RidgeCV с одним alpha, как в итоговой модели: на CSR обычный Ridge
+        # уходит в итерационные решатели, которые на немасштабированных
+        # признаках не сходятся.
+        from sklearn.linear_model import RidgeCV
+        pred = RidgeCV(alphas=[candidate["alpha"]]).fit(X_train, y_train).predict(X_val)
+    else:
+        import xgboost as xgb
+        order = np.random.default_rng(fold).permutation(len(y_train))
+        n_stop = max(1, int(len(order) * EARLY_STOPPING_SHARE))
+        fit_rows, stop_rows = order[n_stop:], order[:n_stop]
+        params = {key: value for key, value in candidate.items() if key != "model"}
+        model = xgb.XGBRegressor(n_estimators=MAX_ESTIMATORS, early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                                 n_jobs=n_jobs, **params)
+        model.fit(X_train[fit_rows], y_train[fit_rows],
+                  eval_set=[(X_train[stop_rows], y_train[stop_rows])], verbose=False)
+        pred = model.predict(X_val)
+        extra["best_iteration"] = int(model.best_iteration)
+    return index, fold, pred, extra, os.getpid(), started, time.time()
+
+
+def blend_weights(oof, y):
+    # Неотрицательные веса без свободного члена; предсказания в log1p около
+    # 12, поэтому сумма весов и без ограничения выходит близкой к единице.
+    from scipy.optimize import nnls
+    weights, _ = nnls(np.asarray(oof).T, y)
+    return weights
+
+
+def rmse(pred, y):
+    return float(np.sqrt(np.mean((pred - y) ** 2)))
+
+
+def select(df_train, k=5, seed=0, workers=None, cache_dir=DEFAULT_CACHE_DIR, grid=None, log=None,
+           sparse=True):
+    t0 = time.perf_counter()
+    directory = prepare_folds(df_train, k, seed, cache_dir, sparse)
+    t_folds = time.perf_counter() - t0
+    y = np.load(os.path.join(directory, "y.npy"))
+    val_idx = [np.load(os.path.join(directory, f"val-{fold}.npy")) for fold in range(k)]
+    grid = grid if grid is not None else candidates()
+
+    # В пуле каждому XGBoost по одному потоку, иначе процессы делят ядра.
+    n_jobs = None if workers == 1 else 1
+    tasks = [(directory, i, candidate, fold, n_jobs) for i, candidate in enumerate(grid) for fold in range(k)]
+    oof = np.zeros((len(grid), len(y)))
+    stats = [{"busy": 0.0, "start": np.inf, "end": -np.inf, "best_iterations": []} for _ in grid]
+
+    def account(index, fold, pred, extra, pid, started, finished):
+        oof[index, val_idx[fold]] = pred
+        s = stats[index]
+        s["busy"] += finished - started
+        s["start"] = min(s["start"], started)
+        s["end"] = max(s["end"], finished)
+        if "best_iteration" in extra:
+            s["best_iterations"].append(extra["best_iteration"])
+        if log:
+            log(f"{describe(grid[index])} fold {fold}: {finished - started:.2f} s (worker {pid})")
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        for task in tasks:
+            account(*evaluate(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(evaluate, *task) for task in tasks]
+            for future in as_completed(futures):
+                account(*future.result())
+    t_search = time.perf_counter() - t0
+
+    report = []
+    for candidate, s, pred in zip(grid, stats, oof):
+        entry = dict(candidate, rmse=rmse(pred, y), busy_seconds=s["busy"], wall_seconds=s["end"] - s["start"])
+        if s["best_iterations"]:
+            entry["best_iterations"] = s["best_iterations"]
+        report.append(entry)
+
+    best = {}
+    for i, entry in enumerate(report):
+        name = entry["model"]
+        if name not in best or entry["rmse"] < report[best[name]]["rmse"]:
+            best[name] = i
+    ridge, boosted = report[best["ridge"]], report[best["xgb"]]
+    pair = oof[[best["ridge"], best["xgb"]]]
+    # Оценка смеси - с нормированными весами, теми же, что уходят в
+    # PricePipeline; сумма исходных весов NNLS остаётся в отчёте.
+    weights = blend_weights(pair, y)
+    shipped = weights / weights.sum()
+    return {
+        "ridge": {"alpha": ridge["alpha"]},
+        "xgb": {"max_depth": boosted["max_depth"], "learning_rate": boosted["learning_rate"],
+                "n_estimators": int(round(np.mean(boosted["best_iterations"]))) + 1},
+        "weights": shipped.tolist(),
+        "cv": {
+            "folds": k,
+            "seed": seed,
+            "rmse_ridge": ridge["rmse"],
+            "rmse_xgb": boosted["rmse"],
+            "rmse_blend": rmse(shipped @ pair, y),
+            "rmse_equal_blend": rmse(pair.mean(axis=0), y),
+            "weights_sum": float(weights.sum()),
+        },
+        "timing": {"folds_seconds": t_folds, "search_seconds": t_search, "tasks": len(tasks)},
+        "candidates": report,
+    }
+
+
+def describe(candidate):
+    return " ".join(f"{key}={value}" for key, value in candidate.items())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Подбор параметров и весов смеси RidgeCV + XGBoost по k-fold CV")
+    parser.add_argument("--train", default=os.path.join(HERE, 'train.csv'))
+    parser.add_argument("-o", "--output", default=os.path.join(HERE, 'selection.json'))
+    parser.add_argument("-k", "--folds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="каталог кэша фолдов и матриц признаков")
+    parser.add_argument("--alphas", type=float, nargs="+", default=RIDGE_ALPHAS)
+    parser.add_argument("--depths", type=int, nargs="+", default=XGB_DEPTHS)
+    parser.add_argument("--learning-rates", type=float, nargs="+", default=XGB_LEARNING_RATES)
+    parser.add_argument("--dense", action="store_true", help="плотная матрица признаков вместо CSR")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    df_train, _ = load_data(args.train, args.train)
+    df_train = remove_outliers(log_target(df_train))
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    result = select(df_train, args.folds, args.seed, args.workers, args.cache_dir,
+                    candidates(args.alphas, args.depths, args.learning_rates), log, sparse=not args.dense)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"{'candidate':<40} {'rmse':>8} {'busy, s':>8} {'wall, s':>8}")
+    for entry in result["candidates"]:
+        params = {key: entry[key] for key in entry if key in ("model", "alpha", "max_depth", "learning_rate")}
+        print(f"{describe(params):<40} {entry['rmse']:8.5f} {entry['busy_seconds']:8.2f} {entry['wall_seconds']:8.2f}")
+    cv, timing = result["cv"], result["timing"]
+    print(f"best ridge {cv['rmse_ridge']:.5f}, best xgb {cv['rmse_xgb']:.5f}, "
+          f"blend {cv['rmse_blend']:.5f} (50/50: {cv['rmse_equal_blend']:.5f}), weights {result['weights']}")
+    print(f"folds {timing['folds_seconds']:.2f} s, search {timing['search_seconds']:.2f} s "
+          f"for {timing['tasks']} tasks on {args.workers} workers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,753 @@
+import argparse
+import csv
+import io
+import json
+import math
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+# (период: 0 - бортовой, 1 - килевой; диапазон отношений; цвет; смещение на диаграмме)
+RESONANCES = [
+    (0, (0.8, 1.2), "orange", 0),
+    (0, (1.85, 2.15), "purple", 1),
+    (1, (0.8, 1.2), "blue", 2)
+]
+
+
+class VesselFleet:
+    # Флот в виде структуры массивов: все параметры корпусов и производные
+    # периоды лежат строками одного непрерывного массива (7, N). generation
+    # растёт при каждом пересчёте периодов судна и сбрасывает его кэши; после
+    # прямой записи в массивы нужно вызвать recalculate_periods.
+    HULL_FIELDS = ("length", "beam", "draft", "metacentric_height", "max_speed")
+    DEFAULTS = {"length": 90.0, "beam": 16, "draft": 5, "metacentric_height": 0.9, "max_speed": 20}
+    FIELDS = HULL_FIELDS + ("roll_period", "pitch_period")
+
+    def __init__(self, size=1, **params):
+        self._allocate(size)
+        for field in self.HULL_FIELDS:
+            getattr(self, field)[:] = params.get(field, self.DEFAULTS[field])
+        self.recalculate_periods()
+
+    def _allocate(self, size):
+        self._data = np.empty((len(self.FIELDS), size))
+        self.generation = np.zeros(size, dtype=np.int64)
+        for k, field in enumerate(self.FIELDS):
+            setattr(self, field, self._data[k])
+
+    @classmethod
+    def from_records(cls, vessels):
+        vessels = list(vessels)
+        params = {field: [v.get(field, cls.DEFAULTS[field]) for v in vessels]
+                  for field in cls.HULL_FIELDS}
+        return cls(len(vessels), **params)
+
+    def __len__(self):
+        return self._data.shape[1]
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def append(self, **params):
+        old, old_generation = self._data, self.generation
+        self._allocate(old.shape[1] + 1)
+        self._data[:, :-1] = old
+        self.generation[:-1] = old_generation
+        for field in self.HULL_FIELDS:
+            getattr(self, field)[-1] = params.get(field, self.DEFAULTS[field])
+        self.recalculate_periods(len(self) - 1)
+        return len(self) - 1
+
+    def vessel(self, index):
+        return VesselDynamicsModel(self, index)
+
+    def recalculate_periods(self, index=slice(None)):
+        self.roll_period[index] = (0.8 * self.beam[index]) / np.sqrt(self.metacentric_height[index])
+        self.pitch_period[index] = 2.5 * np.sqrt(self.draft[index])
+        self.generation[index] += 1
+
+    def resonance_zones(self, wave_lengths, index=slice(None)):
+        # Диапазоны скоростей (уз) резонансных зон: массив (N, M, 3, 2),
+        # последняя ось - (min, max), N судов, M длин волн. Для целого index
+        # ось судов отсутствует: (M, 3, 2).
+        wave_lengths = np.atleast_1d(np.asarray(wave_lengths, dtype=float))
+        periods = self._data[5:7, index].T[..., [r[0] for r in RESONANCES]]
+        bounds = np.array([r[1] for r in RESONANCES])
+        t_min = periods / bounds[:, 1]
+        t_max = periods / bounds[:, 0]
+        wave_speed = 1.25 * np.sqrt(wave_lengths)
+        lam = wave_lengths[:, np.newaxis]
+        v1 = wave_speed[:, np.newaxis] - lam / t_min[..., np.newaxis, :]
+        v2 = wave_speed[:, np.newaxis] - lam / t_max[..., np.newaxis, :]
+        return np.stack([np.minimum(v1, v2) / 0.5144, np.maximum(v1, v2) / 0.5144], axis=-1)
+
+
+class WaveSpectrum:
+    # Нерегулярное волнение: спектр S(omega), разбитый на компоненты шириной
+    # d_omega. Длины волн - по дисперсионному соотношению глубокой воды
+    # (тому же, что даёт скорость волны 1.25*sqrt(L) в модели судна).
+    G = 9.81
+
+    def __init__(self, omega, density, d_omega):
+        self.omega = np.asarray(omega, dtype=float)
+        self.density = np.asarray(density, dtype=float)
+        self.d_omega = np.broadcast_to(np.asarray(d_omega, dtype=float), self.omega.shape)
+        self.energy = self.density * self.d_omega
+        self.wave_length = 2 * math.pi * self.G / self.omega**2
+
+    @staticmethod
+    def _grid(tp, components, omega_range):
+        omega_p = 2 * math.pi / tp
+        lo, hi = omega_range or (0.5 * omega_p, 5.0 * omega_p)
+        edges = np.linspace(lo, hi, components + 1)
+        return omega_p, 0.5 * (edges[:-1] + edges[1:]), np.diff(edges)
+
+    @classmethod
+    def pierson_moskowitz(cls, hs, tp, components=500, omega_range=None):
+        omega_p, omega, d_omega = cls._grid(tp, components, omega_range)
+        density = 5 / 16 * hs**2 * omega_p**4 * omega**-5 * np.exp(-1.25 * (omega / omega_p)**-4)
+        return cls(omega, density, d_omega)
+
+    @classmethod
+    def jonswap(cls, hs, tp, gamma=3.3, components=500, omega_range=None):
+        omega_p, omega, d_omega = cls._grid(tp, components, omega_range)
+        pm = 5 / 16 * hs**2 * omega_p**4 * omega**-5 * np.exp(-1.25 * (omega / omega_p)**-4)
+        sigma = np.where(omega <= omega_p, 0.07, 0.09)
+        peak = gamma ** np.exp(-(omega - omega_p)**2 / (2 * sigma**2 * omega_p**2))
+        return cls(omega, (1 - 0.287 * math.log(gamma)) * pm * peak, d_omega)
+
+    @property
+    def significant_height(self):
+        return 4 * math.sqrt(self.energy.sum())
+
+    @property
+    def weights(self):
+        total = self.energy.sum()
+        return self.energy / total if total > 0 else np.zeros_like(self.energy)
+
+
+def _fleet_field(field):
+    def get(self):
+        return getattr(self.fleet, field).item(self.index)
+
+    def set(self, value):
+        getattr(self.fleet, field)[self.index] = value
+        self.fleet.generation[self.index] += 1
+
+    return property(get, set)
+
+
+class LRUCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, compute, *args):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = self._data[key] = compute(*args)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    def info(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data),
+                "maxsize": self.maxsize, "hit_rate": self.hits / total if total else 0.0}
+
+
+class VesselDynamicsModel:
+    # Представление одного судна поверх VesselFleet. Без аргументов создаёт
+    # собственный флот из одного судна с параметрами по умолчанию.
+    # Кажущийся период и резонансные зоны кэшируются (LRU) по входам,
+    # округлённым с шагом quantization[...] (None - без округления); кэш
+    # очищается, когда меняется generation судна во флоте.
+    QUANTIZATION = {"wave_length": None, "speed": None, "heading": None}
+
+    def __init__(self, fleet=None, index=0, cache_size=256, quantization=None):
+        self.fleet = VesselFleet(1) if fleet is None else fleet
+        self.index = index
+        self.quantization = {**self.QUANTIZATION, **(quantization or {})}
+        self._cache = LRUCache(cache_size)
+        self._cache_generation = None
+
+    length = _fleet_field("length")
+    beam = _fleet_field("beam")
+    draft = _fleet_field("draft")
+    metacentric_height = _fleet_field("metacentric_height")
+    max_speed = _fleet_field("max_speed")
+    roll_period = _fleet_field("roll_period")
+    pitch_period = _fleet_field("pitch_period")
+
+    def recalculate_periods(self):
+        self.fleet.recalculate_periods(self.index)
+
+    def _quantize(self, kind, value):
+        step = self.quantization[kind]
+        return value if step is None else round(value / step) * step
+
+    def _cached(self, key, compute, *args):
+        generation = self.fleet.generation.item(self.index)
+        if generation != self._cache_generation:
+            self._cache.clear()
+            self._cache_generation = generation
+        return self._cache.get(key, compute, *args)
+
+    def cache_info(self):
+        return self._cache.info()
+
+    def calculate_apparent_wave_period(self, wave_length, speed_knots, heading_deg):
+        wave_length = self._quantize("wave_length", wave_length)
+        speed_knots = self._quantize("speed", speed_knots)
+        heading_deg = self._quantize("heading", heading_deg)
+        return self._cached(("tau", wave_length, speed_knots, heading_deg),
+                            self._apparent_wave_period, wave_length, speed_knots, heading_deg)
+
+    def _apparent_wave_period(self, wave_length, speed_knots, heading_deg):
+        v_ms = speed_knots * 0.514
+        heading_rad = math.radians(heading_deg)
+        wave_speed = 1.25 * math.sqrt(wave_length)
+        denom = wave_speed - v_ms * math.cos(heading_rad)
+        if abs(denom) < 0.01:
+            return 999.0
+        return abs(wave_length / denom)
+
+    def calculate_apparent_wave_period_batch(self, wave_length, speed_knots, heading_deg):
+        v_ms = np.asarray(speed_knots, dtype=float) * 0.514
+        heading_rad = np.radians(heading_deg)
+        wave_speed = 1.25 * np.sqrt(wave_length)
+        denom = wave_speed - v_ms * np.cos(heading_rad)
+        with np.errstate(divide="ignore"):
+            tau = np.abs(wave_length / denom)
+        return np.where(np.abs(denom) < 0.01, 999.0, tau)
+
+    def resonance_ratios_batch(self, tau):
+        tau = np.asarray(tau, dtype=float)
+        valid = tau < 900
+        r_roll = np.where(valid, self.roll_period / tau, 0.0)
+        r_pitch = np.where(valid, self.pitch_period / tau, 0.0)
+        return r_roll, r_pitch
+
+    def spectral_response(self, spectrum, speed_knots, heading_deg):
+        # Кажущиеся периоды и отношения резонанса для каждой компоненты спектра.
+        tau = self.calculate_apparent_wave_period_batch(spectrum.wave_length, speed_knots, heading_deg)
+        r_roll, r_pitch = self.resonance_ratios_batch(tau)
+        return {"tau": tau, "r_roll": r_roll, "r_pitch": r_pitch, "weights": spectrum.weights}
+
+    def calculate_resonance_zones(self, wave_length):
+        wave_length = self._quantize("wave_length", wave_length)
+        zones = self._cached(("zones", wave_length), self._resonance_zones, wave_length)
+        return [dict(z) for z in zones]
+
+    def _resonance_zones(self, wave_length):
+        # Скалярный аналог VesselFleet.resonance_zones для одного судна:
+        # на одиночных вызовах numpy только добавил бы накладных расходов.
+        wave_speed = 1.25 * math.sqrt(wave_length)
+        periods = (self.roll_period, self.pitch_period)
+        zones = []
+        for which, (r_min, r_max), color, offset in RESONANCES:
+            t_min = periods[which] / r_max
+            t_max = periods[which] / r_min
+            v1 = wave_speed - wave_length / t_min
+            v2 = wave_speed - wave_length / t_max
+            zones.append({
+                "min": min(v1, v2)/0.5144,
+                "max": max(v1, v2)/0.5144,
+                "color": color,
+                "offset": offset
+            })
+        return zones
+
+
+class DiscreteCentroidDefuzzifier:
+    # Эталон: центроид по точкам y = 0, 2, ..., 100 выходного множества
+    # r_function(y, 50, 100), усечённого на уровне agg.
+    def __call__(self, agg):
+        num = den = 0.0
+        for y in range(0,101,2):
+            mu_out = min(FuzzyDecisionSystem.r_function(y,50,100), agg)
+            num += y*mu_out
+            den += mu_out
+        return 0 if den==0 else num/den
+
+    def batch(self, agg):
+        agg = np.asarray(agg, dtype=float)
+        num = np.zeros(agg.shape)
+        den = np.zeros(agg.shape)
+        mu_out = np.empty(agg.shape)
+        for y in range(0,101,2):
+            np.minimum(FuzzyDecisionSystem.r_function(y,50,100), agg, out=mu_out)
+            num += y*mu_out
+            den += mu_out
+        return np.divide(num, den, out=np.zeros(agg.shape), where=den!=0)
+
+
+class ClosedFormCentroidDefuzzifier:
+    # Та же дискретная сумма в замкнутой форме. Ненулевые точки: y = 50 + 2j,
+    # j = 1..25, mu_j = min(j/25, agg). Первые J = floor(25*agg) точек лежат
+    # на рампе, остальные срезаны на уровне agg. Отличие от эталона - только
+    # ошибка округления (< 1e-12).
+    def __call__(self, agg):
+        if agg <= 0:
+            return 0
+        J = min(int(25*agg), 25)
+        s1 = J*(J + 1)
+        den = s1/50 + (25 - J)*agg
+        num = (s1*(2*J + 1)/3 + 25*s1)/25 + agg*(1900 - s1 - 50*J)
+        return num/den
+
+    def batch(self, agg):
+        agg = np.asarray(agg, dtype=float)
+        a = np.maximum(agg, 0.0)
+        J = np.minimum(np.floor(25*a), 25)
+        s1 = J*(J + 1)
+        den = s1/50 + (25 - J)*a
+        num = (s1*(2*J + 1)/3 + 25*s1)/25 + a*(1900 - s1 - 50*J)
+        return np.divide(num, den, out=np.zeros(agg.shape), where=agg > 0)
+
+
+class LookupTableDefuzzifier:
+    # Таблица значений эталона на равномерной сетке agg in [0, 1] с линейной
+    # интерполяцией. В agg = 0 у центроида разрыв (0 -> 76), поэтому в узел 0
+    # кладётся правый предел, а agg <= 0 обрабатывается отдельно. Изломы
+    # кривой лежат в agg = j/25: при (resolution - 1) кратном 25 они попадают
+    # в узлы, и ошибка интерполяции падает с O(h) до O(h^2).
+    def __init__(self, resolution=1001, reference=None):
+        if resolution < 2:
+            raise ValueError("resolution must be >= 2")
+        reference = reference or ClosedFormCentroidDefuzzifier()
+        self.resolution = resolution
+        grid = np.linspace(0.0, 1.0, resolution)
+        grid[0] = 1e-12
+        self._grid = np.linspace(0.0, 1.0, resolution)
+        self._table = np.asarray(reference.batch(grid), dtype=float)
+        self._values = self._table.tolist()
+        self._scale = resolution - 1
+
+    def __call__(self, agg):
+        if agg <= 0:
+            return 0
+        x = agg*self._scale
+        i = int(x)
+        if i >= self._scale:
+            return self._values[-1]
+        v0 = self._values[i]
+        return v0 + (x - i)*(self._values[i + 1] - v0)
+
+    def batch(self, agg):
+        agg = np.asarray(agg, dtype=float)
+        return np.where(agg > 0, np.interp(agg, self._grid, self._table), 0.0)
+
+
+class FuzzyDecisionSystem:
+    def __init__(self, defuzzifier=None):
+        self.defuzzifier = defuzzifier or DiscreteCentroidDefuzzifier()
+
+    @staticmethod
+    def r_function(x, a, b):
+        if x <= a: return 0.0
+        if x >= b: return 1.0
+        return (x - a)/(b - a)
+
+    @staticmethod
+    def trimf(x, a, b, c):
+        return max(min((x-a)/(b-a+1e-6),(c-x)/(c-b+1e-6)),0)
+
+    def evaluate(self, roll, pitch, r_roll, r_pitch):
+        mu_hr = self.r_function(roll, 12, 20)
+        mu_hp = self.r_function(pitch, 2.5, 4.5)
+        mu_rr_main = self.trimf(r_roll,0.8,1.0,1.2)
+        mu_rr_param = self.trimf(r_roll,1.8,1.9,2.1)
+        mu_rp_main = self.trimf(r_pitch,0.8,1.0,1.2)
+        rule1 = min(mu_hr, mu_rr_main)
+        rule2 = min(mu_hr, mu_rr_param)
+        rule3 = min(mu_hp, mu_rp_main)
+        agg = max(rule1, rule2, rule3)
+        danger = self.defuzzifier(agg)
+        return {"danger": danger,"rules":(rule1,rule2,rule3),"level":agg}
+
+    # Векторные аналоги r_function/trimf: те же операции в том же порядке,
+    # поэтому результаты побитово совпадают со скалярным путём.
+    @staticmethod
+    def r_function_batch(x, a, b):
+        x = np.asarray(x, dtype=float)
+        return np.where(x <= a, 0.0, np.where(x >= b, 1.0, (x - a)/(b - a)))
+
+    @staticmethod
+    def trimf_batch(x, a, b, c):
+        x = np.asarray(x, dtype=float)
+        return np.maximum(np.minimum((x-a)/(b-a+1e-6),(c-x)/(c-b+1e-6)),0)
+
+    def evaluate_batch(self, roll, pitch, r_roll, r_pitch):
+        roll, pitch, r_roll, r_pitch = np.broadcast_arrays(
+            np.asarray(roll, dtype=float), np.asarray(pitch, dtype=float),
+            np.asarray(r_roll, dtype=float), np.asarray(r_pitch, dtype=float))
+        mu_hr = self.r_function_batch(roll, 12, 20)
+        mu_hp = self.r_function_batch(pitch, 2.5, 4.5)
+        mu_rr_main = self.trimf_batch(r_roll,0.8,1.0,1.2)
+        mu_rr_param = self.trimf_batch(r_roll,1.8,1.9,2.1)
+        mu_rp_main = self.trimf_batch(r_pitch,0.8,1.0,1.2)
+        rule1 = np.minimum(mu_hr, mu_rr_main)
+        rule2 = np.minimum(mu_hr, mu_rr_param)
+        rule3 = np.minimum(mu_hp, mu_rp_main)
+        agg = np.maximum(np.maximum(rule1, rule2), rule3)
+        danger = self.defuzzifier.batch(agg)
+        return {"danger": danger,"rules":(rule1,rule2,rule3),"level":agg}
+
+    def evaluate_spectrum(self, roll, pitch, r_roll, r_pitch, weights):
+        # Каждая компонента оценивается как регулярная волна; опасность,
+        # степени правил и уровень усредняются с весами энергии спектра.
+        components = self.evaluate_batch(roll, pitch, r_roll, r_pitch)
+        weights = np.asarray(weights, dtype=float)
+        return {"danger": float(np.dot(weights, components["danger"])),
+                "rules": tuple(float(np.dot(weights, rule)) for rule in components["rules"]),
+                "level": float(np.dot(weights, components["level"])),
+                "component_danger": components["danger"]}
+
+    def danger_map(self, model, wave_length, roll, pitch, heading_step=1.0, speed_step=0.5,
+                   heading=None, speed=None):
+        # Полярная карта опасности: строки - курсовые углы 0..180°,
+        # столбцы - скорости 0..max_speed. Текущие курс и скорость, если
+        # заданы, добавляются в сетку: иначе "оставить как есть" вне узлов
+        # сетки не может быть выбрано.
+        headings = np.arange(0.0, 180.0 + heading_step/2, heading_step)
+        speeds = np.arange(0.0, model.max_speed + speed_step/2, speed_step)
+        if heading is not None:
+            headings = np.union1d(headings, [float(heading)])
+        if speed is not None:
+            speeds = np.union1d(speeds, [float(speed)])
+        tau = model.calculate_apparent_wave_period_batch(
+            wave_length, speeds[np.newaxis, :], headings[:, np.newaxis])
+        r_roll, r_pitch = model.resonance_ratios_batch(tau)
+        danger = self.evaluate_batch(roll, pitch, r_roll, r_pitch)["danger"]
+        return headings, speeds, danger
+
+    @staticmethod
+    def select_safe_setting(headings, speeds, danger, heading, speed, threshold=25, speed_weight=5.0):
+        # Безопасная пара (курс, скорость) с минимальным отклонением от текущей;
+        # speed_weight - сколько градусов курса "стоит" один узел скорости.
+        cost = (np.abs(headings - heading)[:, np.newaxis]
+                + speed_weight * np.abs(speeds - speed)[np.newaxis, :])
+        cost = np.where(danger < threshold, cost, np.inf)
+        i, j = np.unravel_index(np.argmin(cost), cost.shape)
+        if not np.isfinite(cost[i, j]):
+            return None
+        return float(headings[i]), float(speeds[j])
+
+
+class DecisionEngine:
+    DANGER_THRESHOLD = 40
+    RESONANCE_NAMES = ("БОРТОВОЙ ОСНОВНОЙ РЕЗОНАНС",
+                       "БОРТОВОЙ ПАРАМЕТРИЧЕСКИЙ РЕЗОНАНС",
+                       "КИЛЕВОЙ ОСНОВНОЙ РЕЗОНАНС")
+    RESONANCE_CODES = ("roll_main", "roll_param", "pitch_main")
+
+    def __init__(self, model=None, fuzzy=None, wave_length=None, speed=16):
+        self.model = model or VesselDynamicsModel()
+        self.fuzzy = fuzzy or FuzzyDecisionSystem()
+        self.wave_length = 1.2*self.model.length if wave_length is None else wave_length
+        self.speed = speed
+
+    @staticmethod
+    def resonance_flags(r_roll, r_pitch):
+        return ((0.8 <= r_roll) & (r_roll <= 1.2),
+                (1.85 <= r_roll) & (r_roll <= 2.15),
+                (0.8 <= r_pitch) & (r_pitch <= 1.2))
+
+    def detect_resonance(self, r_roll, r_pitch):
+        flags = self.resonance_flags(r_roll, r_pitch)
+        return [name for name, flag in zip(self.RESONANCE_NAMES, flags) if flag]
+
+    def suggest_safe_setting(self, danger, roll, pitch, heading, speed=None, wave_length=None):
+        if danger < self.DANGER_THRESHOLD:
+            return "Курс безопасен"
+        speed = self.speed if speed is None else speed
+        wave_length = self.wave_length if wave_length is None else wave_length
+        headings, speeds, danger_map = self.fuzzy.danger_map(self.model, wave_length, roll, pitch,
+                                                             heading=heading, speed=speed)
+        choice = self.fuzzy.select_safe_setting(headings, speeds, danger_map, heading, speed)
+        if choice is None:
+            return "\nБезопасного сочетания курса и скорости не найдено"
+        test, new_speed = choice
+        if new_speed == speed:
+            return f" \n Рекомендована смена курса на {test:.0f}°"
+        change = "снижение" if new_speed < speed else "увеличение"
+        if abs(test - heading) < 0.5:
+            return f"\nРекомендовано {change} скорости до {new_speed:.1f} уз"
+        return f"\nРекомендована смена курса на {test:.0f}° и {change} скорости до {new_speed:.1f} уз"
+
+    def analyze(self, roll, pitch, heading, speed=None, wave_length=None):
+        speed = self.speed if speed is None else speed
+        wave_length = self.wave_length if wave_length is None else wave_length
+        tau = self.model.calculate_apparent_wave_period(wave_length, speed, heading)
+        r_roll = self.model.roll_period / tau if tau < 900 else 0
+        r_pitch = self.model.pitch_period / tau if tau < 900 else 0
+        fuzzy = self.fuzzy.evaluate(roll, pitch, r_roll, r_pitch)
+        danger = fuzzy["danger"]
+
+        P_E = 0.75
+        P_H = 0.9 * P_E + 0.01 * (1 - P_E)
+        CF = 0.9
+
+        return {"tau": tau, "r_roll": r_roll, "r_pitch": r_pitch,
+                "danger": danger, "rules": fuzzy["rules"], "level": fuzzy["level"],
+                "bayes": P_H, "certainty": CF,
+                "dangerous": danger > self.DANGER_THRESHOLD,
+                "resonances": self.detect_resonance(r_roll, r_pitch),
+                "recommendation": self.suggest_safe_setting(danger, roll, pitch, heading,
+                                                            speed, wave_length)}
+
+    RESONANCE_ENERGY_SHARE = 0.1
+
+    def analyze_spectrum(self, spectrum, roll, pitch, heading, speed=None):
+        speed = self.speed if speed is None else speed
+        response = self.model.spectral_response(spectrum, speed, heading)
+        weights = response["weights"]
+        fuzzy = self.fuzzy.evaluate_spectrum(roll, pitch, response["r_roll"], response["r_pitch"], weights)
+        # Доля энергии спектра, попадающая в каждый из резонансов.
+        shares = tuple(float(np.dot(weights, flag))
+                       for flag in self.resonance_flags(response["r_roll"], response["r_pitch"]))
+        # Средний кажущийся период - по энергии только тех компонент, с
+        # которыми судно встречается (tau < 900); если таких нет - 999, как
+        # в analyze.
+        valid = response["tau"] < 900
+        total = weights[valid].sum()
+        tau = float(np.dot(weights[valid], response["tau"][valid]) / total) if total > 0 else 999.0
+        return {"tau": tau,
+                "danger": fuzzy["danger"], "rules": fuzzy["rules"], "level": fuzzy["level"],
+                "dangerous": fuzzy["danger"] > self.DANGER_THRESHOLD,
+                "resonance_shares": shares,
+                "resonances": [name for name, share in zip(self.RESONANCE_NAMES, shares)
+                               if share >= self.RESONANCE_ENERGY_SHARE],
+                "components": response}
+
+    def analyze_batch(self, roll, pitch, heading, speed=None, wave_length=None):
+        speed = self.speed if speed is None else speed
+        wave_length = self.wave_length if wave_length is None else wave_length
+        tau = self.model.calculate_apparent_wave_period_batch(wave_length, speed, heading)
+        r_roll, r_pitch = self.model.resonance_ratios_batch(tau)
+        fuzzy = self.fuzzy.evaluate_batch(roll, pitch, r_roll, r_pitch)
+        return {"tau": tau, "r_roll": r_roll, "r_pitch": r_pitch,
+                "danger": fuzzy["danger"], "rules": fuzzy["rules"], "level": fuzzy["level"],
+                "dangerous": fuzzy["danger"] > self.DANGER_THRESHOLD,
+                "resonances": self.resonance_flags(r_roll, r_pitch)}
+
+
+# Потоковая пакетная обработка: записи с полями roll, pitch, heading
+# (и необязательными speed, wave_length) из CSV/JSONL, решения - в тот же формат.
+INPUT_FIELDS = ("roll", "pitch", "heading", "speed", "wave_length")
+OUTPUT_FIELDS = ("tau", "r_roll", "r_pitch", "danger", "level",
+                 "rule1", "rule2", "rule3", "dangerous", "resonances")
+
+
+def _read_chunks(stream, fmt, chunk_size):
+    # Вместе с блоком записей - номера их строк во входном файле для сообщений
+    # об ошибках.
+    if fmt == "csv":
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is None:
+            return
+        chunk, lines = [], []
+        for row in reader:
+            if row:
+                chunk.append(row)
+                lines.append(reader.line_num)
+                if len(chunk) >= chunk_size:
+                    yield header, chunk, lines
+                    chunk, lines = [], []
+        if chunk:
+            yield header, chunk, lines
+    else:
+        # Для JSONL сохраняются исходные строки: решения дописываются к ним
+        # без повторной сериализации всей записи.
+        chunk, lines = [], []
+        for n, line in enumerate(stream, start=1):
+            line = line.strip()
+            if line:
+                chunk.append(line)
+                lines.append(n)
+                if len(chunk) >= chunk_size:
+                    yield None, chunk, lines
+                    chunk, lines = [], []
+        if chunk:
+            yield None, chunk, lines
+
+
+def _float_column(name, values, lines):
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        for value, line in zip(values, lines):
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"line {line}: {name} is not a number: {value!r}") from None
+        raise
+
+
+def _chunk_columns(header, chunk, engine, lines):
+    # Пустая ячейка CSV и отсутствующее поле JSONL - пропуск (NaN).
+    # Необязательные скорость и длина волны на месте пропуска берутся
+    # из настроек движка, как в ShipFleetReplay.
+    columns = {}
+    if header is not None:
+        index = {name: i for i, name in enumerate(header)}
+        for name in INPUT_FIELDS:
+            if name in index:
+                i = index[name]
+                values = [row[i].strip() if i < len(row) else "" for row in chunk]
+                columns[name] = _float_column(name, [value or "nan" for value in values], lines)
+    else:
+        try:
+            records = json.loads("[" + ",".join(chunk) + "]")
+        except ValueError:
+            for text, line in zip(chunk, lines):
+                try:
+                    json.loads(text)
+                except ValueError as exc:
+                    raise ValueError(f"line {line}: invalid JSON ({exc.msg})") from None
+            raise
+        for name in INPUT_FIELDS:
+            if any(name in rec for rec in records):
+                columns[name] = _float_column(name, [rec.get(name, np.nan) for rec in records], lines)
+    absent = [name for name in INPUT_FIELDS[:3] if name not in columns]
+    if absent:
+        raise ValueError(f"missing input fields: {', '.join(absent)}")
+    for name in INPUT_FIELDS[:3]:
+        missing = np.flatnonzero(np.isnan(columns[name]))
+        if len(missing):
+            raise ValueError(f"line {lines[missing[0]]}: missing {name}")
+    for name, default in (("speed", engine.speed), ("wave_length", engine.wave_length)):
+        if name in columns:
+            columns[name] = np.where(np.isnan(columns[name]), default, columns[name])
+    return columns
+
+
+def _decision_columns(result, engine, columns, recommend):
+    # Сочетание флагов резонанса -> строка кодов через ";" (8 вариантов).
+    flags = result["resonances"]
+    combos = np.array([";".join(c for k, c in enumerate(engine.RESONANCE_CODES) if mask >> k & 1)
+                       for mask in range(8)], dtype=object)
+    resonances = combos[flags[0] * 1 + flags[1] * 2 + flags[2] * 4]
+    out = {"tau": result["tau"], "r_roll": result["r_roll"], "r_pitch": result["r_pitch"],
+           "danger": result["danger"], "level": result["level"], "rule1": result["rules"][0],
+           "rule2": result["rules"][1], "rule3": result["rules"][2],
+           "dangerous": result["dangerous"].astype(int), "resonances": resonances}
+    out = {name: value.tolist() for name, value in out.items()}
+    if recommend:
+        recs = [""] * len(out["danger"])
+        speed = columns.get("speed")
+        wave_length = columns.get("wave_length")
+        for i in np.flatnonzero(result["dangerous"]):
+            recs[i] = engine.suggest_safe_setting(
+                result["danger"][i], columns["roll"][i], columns["pitch"][i], columns["heading"][i],
+                None if speed is None else speed[i],
+                None if wave_length is None else wave_length[i]).strip()
+        out["recommendation"] = recs
+    return out
+
+
+def _csv_lines(chunk):
+    # Если во входных полях нет символов, требующих кавычек, строки
+    # собираются простым join; иначе - через csv.writer.
+    text = "\x00".join("\x00".join(row) for row in chunk)
+    if not any(c in text for c in ',"\r\n'):
+        return [",".join(row) for row in chunk]
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    lines = []
+    for row in chunk:
+        writer.writerow(row)
+        lines.append(buf.getvalue()[:-1])
+        buf.seek(0)
+        buf.truncate()
+    return lines
+
+
+def process_stream(stream, out, engine=None, fmt="csv", chunk_size=65536, recommend=False):
+    engine = engine or DecisionEngine()
+    fields = OUTPUT_FIELDS + (("recommendation",) if recommend else ())
+    specs = {"dangerous": "%d", "resonances": "%s", "recommendation": "%s"}
+    if fmt == "csv":
+        template = "," + ",".join(specs.get(name, "%.4f") for name in fields) + "\n"
+    else:
+        template = ", ".join(f'"{name}": {specs.get(name, "%.4f")}' for name in fields) + "}\n"
+    count = 0
+    for header, chunk, numbers in _read_chunks(stream, fmt, chunk_size):
+        columns = _chunk_columns(header, chunk, engine, numbers)
+        result = engine.analyze_batch(columns["roll"], columns["pitch"], columns["heading"],
+                                      columns.get("speed"), columns.get("wave_length"))
+        decisions = _decision_columns(result, engine, columns, recommend)
+        if fmt == "csv":
+            if count == 0:
+                out.write(_csv_lines([header + list(fields)])[0] + "\n")
+            if recommend:
+                decisions["recommendation"] = ['"%s"' % r.replace('"', '""') if r else ""
+                                               for r in decisions["recommendation"]]
+            lines = _csv_lines(chunk)
+        else:
+            if recommend:
+                decisions["recommendation"] = [json.dumps(r, ensure_ascii=False)
+                                               for r in decisions["recommendation"]]
+            decisions["resonances"] = [f'"{r}"' for r in decisions["resonances"]]
+            lines = [line[:-1] + ", " if line != "{}" else "{" for line in chunk]
+        rows = zip(*(decisions[name] for name in fields))
+        out.writelines(line + template % values for line, values in zip(lines, rows))
+        count += len(chunk)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная оценка опасности качки по записям CSV/JSONL")
+    parser.add_argument("input", nargs="?", default="-", help="файл записей или '-' для stdin")
+    parser.add_argument("-o", "--output", default="-", help="файл результатов или '-' для stdout")
+    parser.add_argument("--format", choices=("csv", "jsonl"),
+                        help="формат записей (по умолчанию - по расширению файла, иначе csv)")
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument("--speed", type=float, default=16, help="скорость, если нет в записях (уз)")
+    parser.add_argument("--wave-length", type=float, help="длина волны, если нет в записях (м)")
+    parser.add_argument("--recommend", action="store_true",
+                        help="подбирать безопасные курс/скорость для опасных записей")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "jsonl" if args.input.endswith((".jsonl", ".json")) else "csv"
+    engine = DecisionEngine(wave_length=args.wave_length, speed=args.speed)
+    src = sys.stdin if args.input == "-" else open(args.input, newline="", encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        start = time.perf_counter()
+        count = process_stream(src, dst, engine, fmt, args.chunk_size, args.recommend)
+        elapsed = time.perf_counter() - start
+    except ValueError as exc:
+        print(f"{args.input}: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    print(f"{count} records in {elapsed:.2f} s ({rate:.0f} records/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from ShipDecisionEngine import DecisionEngine, VesselDynamicsModel
+
+# Воспроизведение ретроспективных данных по флоту: каждое судно со своими
+# размерениями, ряды волнения режутся на блоки по времени, блоки считаются
+# в пуле процессов и пишутся в отдельные файлы part-NNNNNN.*. Готовый файл и
+# есть контрольная точка: при повторном запуске такие блоки пропускаются.
+# План блоков судна (размер блока, формат, параметры корпуса, размер и время
+# изменения исходного ряда) записан в manifest.json рядом с блоками; если
+# план изменился, старые блоки удаляются и считаются заново.
+HINDCAST_COLUMNS = ("time", "roll", "pitch", "heading", "speed", "wave_length")
+HULL_FIELDS = ("length", "beam", "draft", "metacentric_height", "max_speed")
+MANIFEST = "manifest.json"
+RESULT_COLUMNS = ("time", "tau", "r_roll", "r_pitch", "danger", "level",
+                  "rule1", "rule2", "rule3", "dangerous", "resonances")
+
+
+def load_fleet(path):
+    with open(path, encoding="utf-8") as f:
+        fleet = json.load(f)
+    if isinstance(fleet, dict):
+        fleet = fleet["vessels"]
+    names = [v["name"] for v in fleet]
+    if len(set(names)) != len(names):
+        raise ValueError("vessel names must be unique")
+    return fleet
+
+
+def build_model(vessel):
+    model = VesselDynamicsModel()
+    for field in HULL_FIELDS:
+        if field in vessel:
+            setattr(model, field, float(vessel[field]))
+    model.recalculate_periods()
+    return model
+
+
+def stage_hindcast(source, staged):
+    # CSV переводится один раз в .npy фиксированной раскладки HINDCAST_COLUMNS
+    # (отсутствующие столбцы - NaN), дальше блоки читаются через memmap.
+    if source.endswith(".npy"):
+        data = np.load(source, mmap_mode="r")
+        if data.ndim != 2 or data.shape[1] != len(HINDCAST_COLUMNS):
+            raise ValueError(f"{source}: expected an (n, {len(HINDCAST_COLUMNS)}) array")
+        return source
+    if os.path.exists(staged) and os.path.getmtime(staged) >= os.path.getmtime(source):
+        return staged
+    with open(source, encoding="utf-8") as f:
+        header = f.readline().strip().split(",")
+    raw = np.loadtxt(source, delimiter=",", skiprows=1, ndmin=2)
+    data = np.full((raw.shape[0], len(HINDCAST_COLUMNS)), np.nan)
+    for k, name in enumerate(HINDCAST_COLUMNS):
+        if name in header:
+            data[:, k] = raw[:, header.index(name)]
+    missing = [name for name in HINDCAST_COLUMNS[1:4] if name not in header]
+    if missing:
+        raise ValueError(f"{source}: missing columns {', '.join(missing)}")
+    tmp = staged + ".tmp.npy"
+    np.save(tmp, data)
+    os.replace(tmp, staged)
+    return staged
+
+
+def find_hindcast(hindcast_dir, name):
+    for ext in (".npy", ".csv"):
+        path = os.path.join(hindcast_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"no hindcast data for vessel {name!r} in {hindcast_dir}")
+
+
+def plan_tasks(fleet, staged_paths, chunk_rows):
+    tasks = []
+    for vessel, path in zip(fleet, staged_paths):
+        n = np.load(path, mmap_mode="r").shape[0]
+        for part, start in enumerate(range(0, n, chunk_rows)):
+            tasks.append((vessel, path, part, start, min(start + chunk_rows, n)))
+    return tasks
+
+
+def part_path(out_dir, vessel_name, part, fmt):
+    return os.path.join(out_dir, vessel_name, f"part-{part:06d}.{fmt}")
+
+
+def checkpoint_manifest(vessel, source, rows, chunk_rows, fmt):
+    stat = os.stat(source)
+    return {"vessel": vessel, "source": os.path.abspath(source), "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns, "rows": rows, "chunk_rows": chunk_rows, "format": fmt}
+
+
+def load_manifest(out_dir, vessel_name):
+    path = os.path.join(out_dir, vessel_name, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def prepare_checkpoint(out_dir, manifest, resume=True, log=None):
+    # Блоки судна продолжаются, только если посчитаны по тому же плану;
+    # иначе все part-* удаляются, и manifest.json описывает новый план.
+    name = manifest["vessel"]["name"]
+    vessel_dir = os.path.join(out_dir, name)
+    os.makedirs(vessel_dir, exist_ok=True)
+    parts = [p for p in os.listdir(vessel_dir) if p.startswith("part-")]
+    if parts and (not resume or load_manifest(out_dir, name) != manifest):
+        if resume and log:
+            log(f"{name}: checkpoint does not match this run (chunk size, format, hull or source changed), "
+                f"discarding {len(parts)} parts")
+        for part in parts:
+            os.remove(os.path.join(vessel_dir, part))
+    tmp = os.path.join(vessel_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(vessel_dir, MANIFEST))
+
+
+_engines = {}
+
+
+def _engine_for(vessel):
+    key = json.dumps(vessel, sort_keys=True)
+    engine = _engines.get(key)
+    if engine is None:
+        engine = _engines[key] = DecisionEngine(build_model(vessel))
+    return engine
+
+
+def replay_chunk(vessel, path, start, stop, target, fmt):
+    t0 = time.perf_counter()
+    engine = _engine_for(vessel)
+    data = np.load(path, mmap_mode="r")[start:stop]
+    speed = np.where(np.isnan(data[:, 4]), engine.speed, data[:, 4])
+    wave_length = np.where(np.isnan(data[:, 5]), engine.wave_length, data[:, 5])
+    result = engine.analyze_batch(data[:, 1], data[:, 2], data[:, 3], speed, wave_length)
+    flags = result["resonances"]
+    table = np.column_stack([
+        data[:, 0], result["tau"], result["r_roll"], result["r_pitch"],
+        result["danger"], result["level"], *result["rules"],
+        result["dangerous"], flags[0] * 1 + flags[1] * 2 + flags[2] * 4])
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + ".tmp"
+    with open(tmp, "wb") as f:
+        if fmt == "npy":
+            np.save(f, table)
+        else:
+            np.savetxt(f, table, delimiter=",", header=",".join(RESULT_COLUMNS), comments="",
+                       fmt=["%.6g"] + ["%.4f"] * 8 + ["%d", "%d"])
+    os.replace(tmp, target)
+    return os.getpid(), stop - start, time.perf_counter() - t0
+
+
+def replay(fleet, hindcast_dir, out_dir, workers=None, chunk_rows=100_000, fmt="csv",
+           resume=True, log=None):
+    os.makedirs(out_dir, exist_ok=True)
+    stage_dir = os.path.join(out_dir, "_staged")
+    os.makedirs(stage_dir, exist_ok=True)
+    sources = [find_hindcast(hindcast_dir, v["name"]) for v in fleet]
+    staged = [stage_hindcast(source, os.path.join(stage_dir, v["name"] + ".npy"))
+              for v, source in zip(fleet, sources)]
+    for vessel, source, path in zip(fleet, sources, staged):
+        rows = np.load(path, mmap_mode="r").shape[0]
+        prepare_checkpoint(out_dir, checkpoint_manifest(vessel, source, rows, chunk_rows, fmt), resume, log)
+    tasks = plan_tasks(fleet, staged, chunk_rows)
+    todo = []
+    for vessel, path, part, start, stop in tasks:
+        target = part_path(out_dir, vessel["name"], part, fmt)
+        if resume and os.path.exists(target):
+            continue
+        todo.append((vessel, path, start, stop, target, fmt))
+
+    stats = {}
+    t0 = time.perf_counter()
+
+    def account(pid, rows, elapsed):
+        s = stats.setdefault(pid, {"tasks": 0, "rows": 0, "busy": 0.0})
+        s["tasks"] += 1
+        s["rows"] += rows
+        s["busy"] += elapsed
+        if log:
+            done = sum(v["tasks"] for v in stats.values())
+            log(f"[{done}/{len(todo)}] worker {pid}: {rows} rows in {elapsed:.2f} s")
+
+    if workers == 1:
+        for task in todo:
+            account(*replay_chunk(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(replay_chunk, *task) for task in todo]
+            for future in as_completed(futures):
+                account(*future.result())
+
+    wall = time.perf_counter() - t0
+    rows = sum(s["rows"] for s in stats.values())
+    report = {
+        "tasks_total": len(tasks),
+        "tasks_skipped": len(tasks) - len(todo),
+        "rows": rows,
+        "wall_seconds": wall,
+        "rows_per_second": rows / wall if wall > 0 else 0.0,
+        "workers": {str(pid): {**s, "rows_per_second": s["rows"] / s["busy"] if s["busy"] else 0.0}
+                    for pid, s in sorted(stats.items())},
+    }
+    with open(os.path.join(out_dir, "replay_stats.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def merge_parts(out_dir, vessel_name, target):
+    # Склейка в один CSV ровно тех блоков, что входят в план из manifest.json,
+    # в порядке номеров частей.
+    manifest = load_manifest(out_dir, vessel_name)
+    if manifest is None or manifest["format"] != "csv":
+        raise ValueError(f"{vessel_name}: no CSV replay to merge in {out_dir}")
+    n_parts = -(-manifest["rows"] // manifest["chunk_rows"])
+    parts = [part_path(out_dir, vessel_name, part, "csv") for part in range(n_parts)]
+    missing = [part for part in parts if not os.path.exists(part)]
+    if missing:
+        raise FileNotFoundError(f"{vessel_name}: {len(missing)} of {n_parts} parts are missing")
+    with open(target, "w", encoding="utf-8") as out:
+        for k, part in enumerate(parts):
+            with open(part, encoding="utf-8") as f:
+                header = f.readline()
+                if k == 0:
+                    out.write(header)
+                out.writelines(f)
+    return len(parts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Многопроцессное воспроизведение ретроспективы волнения по флоту")
+    parser.add_argument("fleet", help="JSON со списком судов (name, length, beam, draft, metacentric_height, max_speed)")
+    parser.add_argument("hindcast", help="каталог с рядами <name>.csv или <name>.npy")
+    parser.add_argument("output", help="каталог для результатов")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=("csv", "npy"), default="csv")
+    parser.add_argument("--no-resume", action="store_true", help="пересчитать уже готовые блоки")
+    parser.add_argument("--merge", action="store_true", help="склеить CSV-блоки каждого судна в <name>.csv")
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    fleet = load_fleet(args.fleet)
+    log = None if args.quiet else (lambda msg: print(msg, file=sys.stderr))
+    report = replay(fleet, args.hindcast, args.output, args.workers, args.chunk_rows,
+                    args.format, not args.no_resume, log)
+    if args.merge and args.format == "csv":
+        for vessel in fleet:
+            merge_parts(args.output, vessel["name"], os.path.join(args.output, vessel["name"] + ".csv"))
+
+    print(f"{report['rows']} rows, {report['tasks_total'] - report['tasks_skipped']} tasks "
+          f"({report['tasks_skipped']} resumed) in {report['wall_seconds']:.2f} s "
+          f"({report['rows_per_second']:.0f} rows/s)")
+    for pid, s in report["workers"].items():
+        print(f"  worker {pid}: {s['tasks']} tasks, {s['rows']} rows, {s['rows_per_second']:.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,79 +1,99 @@
+import argparse
 import tkinter as tk
 from tkinter import ttk
 import math
 
-class VesselDynamicsModel:
-    def __init__(self):
-        self.length = 90.0
-        self.beam = 16
-        self.draft = 5
-        self.metacentric_height = 0.9
-        self.max_speed = 20
-        self.recalculate_periods()
-
-    def recalculate_periods(self):
-        self.roll_period = (0.8 * self.beam) / math.sqrt(self.metacentric_height)
-        self.pitch_period = 2.5 * math.sqrt(self.draft)
-
-    def calculate_apparent_wave_period(self, wave_length, speed_knots, heading_deg):
-        v_ms = speed_knots * 0.514
-        heading_rad = math.radians(heading_deg)
-        wave_speed = 1.25 * math.sqrt(wave_length)
-        denom = wave_speed - v_ms * math.cos(heading_rad)
-        if abs(denom) < 0.01:
-            return 999.0
-        return abs(wave_length / denom)
-
-    def calculate_resonance_zones(self, wave_length):
-        wave_speed = 1.25 * math.sqrt(wave_length)
-        zones = []
-        resonances = [
-            (self.roll_period, (0.8, 1.2), "orange", 0), 
-            (self.roll_period, (1.85, 2.15), "purple", 1), 
-            (self.pitch_period, (0.8, 1.2), "blue", 2) 
-        ]
-        for period, (r_min, r_max), color, offset in resonances:
-            t_min = period / r_max
-            t_max = period / r_min
-            v1 = wave_speed - wave_length / t_min
-            v2 = wave_speed - wave_length / t_max
-            zones.append({
-                "min": min(v1, v2)/0.5144,
-                "max": max(v1, v2)/0.5144,
-                "color": color,
-                "offset": offset
-            })
-        return zones
-
-
-class FuzzyDecisionSystem:
-    @staticmethod
-    def r_function(x, a, b):
-        if x <= a: return 0.0
-        if x >= b: return 1.0
-        return (x - a)/(b - a)
-
-    @staticmethod
-    def trimf(x, a, b, c):
-        return max(min((x-a)/(b-a+1e-6),(c-x)/(c-b+1e-6)),0)
-
-    def evaluate(self, roll, pitch, r_roll, r_pitch):
-        mu_hr = self.r_function(roll, 12, 20)
-        mu_hp = self.r_function(pitch, 2.5, 4.5)
-        mu_rr_main = self.trimf(r_roll,0.8,1.0,1.2)
-        mu_rr_param = self.trimf(r_roll,1.8,1.9,2.1)
-        mu_rp_main = self.trimf(r_pitch,0.8,1.0,1.2)
-        rule1 = min(mu_hr, mu_rr_main)
-        rule2 = min(mu_hr, mu_rr_param)
-        rule3 = min(mu_hp, mu_rp_main)
-        agg = max(rule1, rule2, rule3)
-        num = den = 0.0
-        for y in range(0,101,2):
-            mu_out = min(FuzzyDecisionSystem.r_function(y,50,100), agg)
-            num += y*mu_out
-            den += mu_out
-        danger = 0 if den==0 else num/den
-        return {"danger": danger,"rules":(rule1,rule2,rule3),"level":agg}
+from ShipDecisionEngine import DecisionEngine
+
+
+class PolarDiagramRenderer:
+    # Слои диаграммы помечены тегами: "grid", "zones" и "legend" строятся
+    # один раз и перестраиваются только при смене размера холста, длины волны
+    # или параметров судна; "vector" (скорость/курс) двигается через coords.
+    ZONE_ARC_STEP = 4
+    LEGEND = [("orange", "Осн. бор."), ("purple", "Пар. бор."), ("blue", "Осн. кил.")]
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._static_key = None
+        self._geometry = None
+        self._arrow = None
+        self._marker = None
+
+    def invalidate(self):
+        self._static_key = None
+
+    def draw(self, model, wave_length, speed, heading):
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if w < 50:
+            self.canvas.delete("all")
+            self._static_key = None
+            self._arrow = self._marker = None
+            return
+        key = (w, h, wave_length, model.length, model.beam, model.draft,
+               model.metacentric_height, model.max_speed)
+        if key != self._static_key:
+            self.canvas.delete("all")
+            self._arrow = self._marker = None
+            self._draw_static(model, wave_length, w, h)
+            self._static_key = key
+        self._draw_vector(speed, heading)
+
+    def _draw_static(self, model, wave_length, w, h):
+        cx, cy = w / 2, h - 30
+        R = min(cx, cy) * 0.95
+        scale = R / model.max_speed
+        self._geometry = (cx, cy, scale)
+
+        for v in range(5, 25, 5):
+            r = v * scale
+            self.canvas.create_arc(cx - r, cy - r, cx + r, cy + r, start=0, extent=180,
+                                   outline="lightgray", style=tk.ARC, tags="grid")
+            self.canvas.create_text(cx + r + 5, cy - 5, text=str(v), fill="gray", tags="grid")
+
+        for a in range(0, 181, 30):
+            rad = math.radians(a)
+            x = cx - R * math.cos(rad)
+            y = cy - R * math.sin(rad)
+            self.canvas.create_line(cx, cy, x, y, fill="lightgray", tags="grid")
+            self.canvas.create_text(x, y - 10, text=f"{a}°", tags="grid")
+
+        # Каждая зона - вертикальная полоса скоростей, обрезанная верхним
+        # полукругом радиуса R: один многоугольник вместо построчных прямоугольников.
+        for z in model.calculate_resonance_zones(wave_length):
+            x1 = cx - z["max"] * scale
+            x2 = cx - z["min"] * scale
+            lx = max(min(x1, x2), cx - R)
+            rx = min(max(x1, x2), cx + R)
+            if lx >= rx:
+                continue
+            y0 = cy + z["offset"] * 2
+            n = max(2, int(math.ceil((rx - lx) / self.ZONE_ARC_STEP)) + 1)
+            points = [lx, y0]
+            for k in range(n):
+                x = lx + (rx - lx) * k / (n - 1)
+                points += [x, cy - math.sqrt(max(R**2 - (x - cx)**2, 0.0)) + z["offset"] * 2]
+            points += [rx, y0]
+            self.canvas.create_polygon(points, fill=z["color"], outline="",
+                                       stipple="gray50", tags="zones")
+
+        for i, (col, text) in enumerate(self.LEGEND):
+            self.canvas.create_rectangle(20, 20 + i * 25, 35, 35 + i * 25, fill=col, outline="",
+                                         stipple="gray25", tags="legend")
+            self.canvas.create_text(40, 27 + i * 25, text=text, anchor=tk.W, tags="legend")
+
+    def _draw_vector(self, speed, heading):
+        cx, cy, scale = self._geometry
+        rad = math.radians(heading)
+        sx = cx - speed * scale * math.cos(rad)
+        sy = cy - speed * scale * math.sin(rad)
+        if self._arrow is None:
+            self._arrow = self.canvas.create_line(cx, cy, sx, sy, arrow=tk.LAST, width=2, tags="vector")
+            self._marker = self.canvas.create_oval(sx - 5, sy - 5, sx + 5, sy + 5, fill="black",
+                                                   outline="white", width=2, tags="vector")
+        else:
+            self.canvas.coords(self._arrow, cx, cy, sx, sy)
+            self.canvas.coords(self._marker, sx - 5, sy - 5, sx + 5, sy + 5)
 
 
 class DecisionSupportApp(tk.Tk):
@@ -81,11 +101,12 @@ class DecisionSupportApp(tk.Tk):
         super().__init__()
 
         self.geometry("600x750")
-        self.model = VesselDynamicsModel()
-        self.fuzzy = FuzzyDecisionSystem()
+        self.engine = DecisionEngine()
+        self.model = self.engine.model
+        self.fuzzy = self.engine.fuzzy
 
-        self.wave_length = 1.2*self.model.length  
-        self.speed = 16        
+        self.wave_length = self.engine.wave_length
+        self.speed = self.engine.speed
 
         self.heading_var = tk.DoubleVar(value=90.0)
         self.roll_var = tk.DoubleVar(value=12.0)
@@ -103,14 +124,7 @@ class DecisionSupportApp(tk.Tk):
         style.configure("TEntry", font=("Segoe UI", 10))
 
     def detect_resonance(self, r_roll, r_pitch):
-        resonances = []
-        if 0.8 <= r_roll <= 1.2:
-            resonances.append("БОРТОВОЙ ОСНОВНОЙ РЕЗОНАНС")
-        if 1.85 <= r_roll <= 2.15:
-            resonances.append("БОРТОВОЙ ПАРАМЕТРИЧЕСКИЙ РЕЗОНАНС")
-        if 0.8 <= r_pitch <= 1.2:
-            resonances.append("КИЛЕВОЙ ОСНОВНОЙ РЕЗОНАНС")
-        return resonances
+        return self.engine.detect_resonance(r_roll, r_pitch)
 
     def create_ui(self):
         main = ttk.Frame(self, padding=10)
@@ -178,6 +192,7 @@ class DecisionSupportApp(tk.Tk):
         ttk.Label(main, text="Диаграмма резонансных зон", font=("Segoe UI", 11, "bold")).pack(anchor=tk.W, pady=(0, 5))
         self.canvas = tk.Canvas(main, bg="white", height=400)  
         self.canvas.pack(fill=tk.BOTH, expand=False, pady=(0, 0))  
+        self.diagram = PolarDiagramRenderer(self.canvas)
         self.canvas.bind("<Configure>", lambda e: self.draw_diagram())
 
     def create_entry_row(self, parent, label_text, var, min_val, max_val):
@@ -211,52 +226,52 @@ class DecisionSupportApp(tk.Tk):
         self.run_analysis()
 
     def suggest_safe_heading(self, danger):
-        if danger < 40:
-            return "Курс безопасен"
-        base = self.heading_var.get()
-        for d in [10, -10, 20, -20, 30, -30, 45, -45, 90, -90]:
-            test = base + d
-            if test < 0:
-                test = abs(test)
-            if test > 180:
-                test = 180 - (test - 180)
-            tau = self.model.calculate_apparent_wave_period(
-                self.wave_length,
-                self.speed,
-                test
-            )
-            r_roll = self.model.roll_period / tau if tau < 900 else 0
-            r_pitch = self.model.pitch_period / tau if tau < 900 else 0
-            res = self.fuzzy.evaluate(
-                self.roll_var.get(),
-                self.pitch_var.get(),
-                r_roll, r_pitch
-            )
-            if res["danger"] < 25:
-                return f" \n Рекомендована смена курса на {test:.0f}°"
-        return "\nРекомендовано снижение скорости"
+        return self.engine.suggest_safe_setting(
+            danger,
+            self.roll_var.get(),
+            self.pitch_var.get(),
+            self.heading_var.get(),
+            self.speed,
+            self.wave_length
+        )
 
     def run_analysis(self):
-        wl = self.wave_length
-        sp = self.speed
-        hd = self.heading_var.get()
-        roll = self.roll_var.get()
-        pitch = self.pitch_var.get()
-
-        tau = self.model.calculate_apparent_wave_period(wl, sp, hd)
-        r_roll = self.model.roll_period / tau if tau < 900 else 0
-        r_pitch = self.model.pitch_period / tau if tau < 900 else 0
-        fuzzy = self.fuzzy.evaluate(roll, pitch, r_roll, r_pitch)
-        danger = fuzzy["danger"]
-        resonance_types = self.detect_resonance(r_roll, r_pitch)
-
-        P_E = 0.75
-        P_H = 0.9 * P_E + 0.01 * (1 - P_E)
-        CF = 0.9
-
-        
-
-        rec = self.suggest_safe_heading(danger)
+        result = self.engine.analyze(
+            self.roll_var.get(),
+            self.pitch_var.get(),
+            self.heading_var.get(),
+            self.speed,
+            self.wave_length
+        )
+        self.show_result(result)
+
+    def attach_feed(self, feed, poll_ms=50):
+        # Результаты SensorFeed забираются из очереди по таймеру Tk:
+        # mainloop не блокируется, анализ идёт в потоке приёма.
+        self.feed = feed
+        self.feed_poll_ms = poll_ms
+        self.after(poll_ms, self.poll_feed)
+
+    def poll_feed(self):
+        result = self.feed.poll()
+        if result is not None:
+            self.roll_var.set(round(result["roll"], 1))
+            self.pitch_var.set(round(result["pitch"], 1))
+            self.heading_var.set(round(result["heading"], 1))
+            if result["speed"] is not None:
+                self.speed = result["speed"]
+            self.show_result(result)
+            self.update_idletasks()
+            latency = self.feed.record_displayed(result)
+            self.log_analysis.insert(tk.END, f"\nЗадержка: {latency * 1e3:.0f} мс")
+        self.after(self.feed_poll_ms, self.poll_feed)
+
+    def show_result(self, result):
+        tau, r_roll, r_pitch = result["tau"], result["r_roll"], result["r_pitch"]
+        danger = result["danger"]
+        resonance_types = result["resonances"]
+        rec = result["recommendation"]
+        P_H, CF = result["bayes"], result["certainty"]
 
         log = (f"ТЕКУЩИЕ ПАРАМЕТРЫ:\n"
                f"τ_волны: {tau:.2f} c\n"
@@ -266,16 +281,16 @@ class DecisionSupportApp(tk.Tk):
                f"Байеc: {P_H:.4f}\n"
                f"Шортлифф: {CF:.2f}\n"
                f"СТЕПЕНЬ ДОВЕРИЯ ПРАВИЛАМ:\n"
-               f"Правило 1: {fuzzy['rules'][0]:.2f}\n"
-               f"Правило 2: {fuzzy['rules'][1]:.2f}\n"
-               f"Правило 3: {fuzzy['rules'][2]:.2f}\n"
+               f"Правило 1: {result['rules'][0]:.2f}\n"
+               f"Правило 2: {result['rules'][1]:.2f}\n"
+               f"Правило 3: {result['rules'][2]:.2f}\n"
                f"ВЕРОЯТНОСТЬ ОПАСНОСТИ: {danger:.1f}%")
 
         self.log_analysis.delete(1.0, tk.END)
         self.log_decision.delete(1.0, tk.END)
         self.log_analysis.insert(tk.END, log)
 
-        if danger > 40:
+        if result["dangerous"]:
             self.log_decision.insert(tk.END, "ОПАСНАЯ СИТУАЦИЯ", "danger")
             for r in resonance_types:
                 self.log_decision.insert(tk.END, f"\n• {r} ", "danger")
@@ -286,62 +301,25 @@ class DecisionSupportApp(tk.Tk):
         self.draw_diagram()
 
     def draw_diagram(self):
-        self.canvas.delete("all")
-        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
-        if w < 50:
-            return
-        cx, cy = w / 2, h - 30
-        R = min(cx, cy) * 0.95
-        scale = R / self.model.max_speed
-
-        for v in range(5, 25, 5):
-            r = v * scale
-            self.canvas.create_arc(cx - r, cy - r, cx + r, cy + r, start=0, extent=180, outline="lightgray", style=tk.ARC)
-            self.canvas.create_text(cx + r + 5, cy - 5, text=str(v), fill="gray")
-
-        for a in range(0, 181, 30):
-            rad = math.radians(a)
-            x = cx - R * math.cos(rad)
-            y = cy - R * math.sin(rad)
-            self.canvas.create_line(cx, cy, x, y, fill="lightgray")
-            self.canvas.create_text(x, y - 10, text=f"{a}°")
-
-        zones = self.model.calculate_resonance_zones(self.wave_length)
-
-        step = 2
-        for y in range(int(cy - R), int(cy), step):
-            dy = cy - y
-            if R**2 - dy**2 < 0:
-                continue
-            hw = math.sqrt(R**2 - dy**2)
-            left_limit, right_limit = cx - hw, cx + hw
-            for z in zones:
-                x1 = cx - z["max"] * scale
-                x2 = cx - z["min"] * scale
-                lx = max(min(x1, x2), left_limit)
-                rx = min(max(x1, x2), right_limit)
-                if lx < rx:
-                    y_offset = y + z["offset"] * step
-                    self.canvas.create_rectangle(
-                        lx, y_offset, rx, y_offset + step,
-                        fill=z["color"],
-                        outline="",
-                        stipple="gray50"
-                    )
-
-        sp = self.speed
-        hd = self.heading_var.get()
-        rad = math.radians(hd)
-        sx = cx - sp * scale * math.cos(rad)
-        sy = cy - sp * scale * math.sin(rad)
-        self.canvas.create_line(cx, cy, sx, sy, arrow=tk.LAST, width=2)
-        self.canvas.create_oval(sx - 5, sy - 5, sx + 5, sy + 5, fill="black", outline="white", width=2)
-
-        colors = [("orange", "Осн. бор."), ("purple", "Пар. бор."), ("blue", "Осн. кил.")]
-        for i, (col, text) in enumerate(colors):
-            self.canvas.create_rectangle(20, 20 + i * 25, 35, 35 + i * 25, fill=col, outline="", stipple="gray25")
-            self.canvas.create_text(40, 27 + i * 25, text=text, anchor=tk.W)
-
+        self.diagram.draw(self.model, self.wave_length, self.speed, self.heading_var.get())
 
 if __name__ == "__main__":
-    DecisionSupportApp().mainloop()
+    parser = argparse.ArgumentParser(description="Система поддержки решений по режиму движения судна")
+    parser.add_argument("--udp", type=int, metavar="PORT", help="принимать NMEA по UDP")
+    parser.add_argument("--tcp", type=int, metavar="PORT", help="принимать NMEA по TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--wave-direction", type=float, default=0.0,
+                        help="направление распространения волны, °")
+    args = parser.parse_args()
+
+    app = DecisionSupportApp()
+    if args.udp or args.tcp:
+        from ShipSensorFeed import SensorFeed
+        # Отдельный движок (своё представление судна и свой кэш) для потока приёма.
+        engine = DecisionEngine(app.model.fleet.vessel(app.model.index), wave_length=app.wave_length,
+                                speed=app.speed)
+        feed = SensorFeed(engine, wave_direction=args.wave_direction).start(
+            udp=(args.host, args.udp) if args.udp else None,
+            tcp=(args.host, args.tcp) if args.tcp else None)
+        app.attach_feed(feed)
+    app.mainloop()
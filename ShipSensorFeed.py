@@ -0,0 +1,357 @@
+import argparse
+import asyncio
+import math
+import queue
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import deque
+from functools import reduce
+
+from ShipDecisionEngine import DecisionEngine
+
+# Приём данных датчиков в реальном времени. Асинхронный цикл работает в
+# отдельном потоке: принимает NMEA-строки по UDP/TCP, копит качку в окне,
+# не чаще max_rate раз в секунду запускает анализ (пачки сообщений
+# схлопываются в один прогон) и кладёт результаты в потокобезопасную
+# очередь, которую интерфейс опрашивает из своего mainloop.
+#
+# Поддерживаемые сообщения:
+#   $--HDT,<курс>,T               истинный курс, °
+#   $--VTG,...,<скорость>,N,...   скорость относительно грунта, уз (поле 5)
+#   $PHTRO,<дифф.>,M|P,<крен>,B|T  килевая и бортовая качка, °
+
+
+def nmea_checksum(body):
+    return reduce(lambda acc, ch: acc ^ ord(ch), body, 0)
+
+
+def parse_nmea(line):
+    line = line.strip()
+    if not line.startswith("$"):
+        return None
+    body, star, checksum = line[1:].partition("*")
+    if star:
+        try:
+            if int(checksum[:2], 16) != nmea_checksum(body):
+                return None
+        except ValueError:
+            return None
+    fields = body.split(",")
+    kind = fields[0][-3:] if not fields[0].startswith("P") else fields[0]
+    try:
+        if kind == "HDT":
+            return "heading", float(fields[1])
+        if kind == "VTG":
+            return "speed", float(fields[5])
+        if kind == "PHTRO":
+            pitch = float(fields[1]) * (1 if fields[2] == "M" else -1)
+            roll = float(fields[3]) * (1 if fields[4] == "B" else -1)
+            return "motion", (roll, pitch)
+    except (IndexError, ValueError):
+        return None
+    return None
+
+
+def nmea_sentence(body):
+    return f"${body}*{nmea_checksum(body):02X}"
+
+
+def relative_heading(heading, wave_direction):
+    # Курсовой угол к волне 0..180° (0 - волна попутная), wave_direction -
+    # направление, куда бежит волна.
+    return abs((heading - wave_direction + 180.0) % 360.0 - 180.0)
+
+
+class MotionWindow:
+    def __init__(self, seconds=30.0, smoothing=0.3):
+        self.seconds = seconds
+        self.smoothing = smoothing
+        self.samples = deque()
+        self.roll_amplitude = None
+        self.pitch_amplitude = None
+
+    def add(self, t, roll, pitch):
+        self.samples.append((t, roll, pitch))
+        while self.samples and self.samples[0][0] < t - self.seconds:
+            self.samples.popleft()
+
+    def amplitudes(self):
+        # Амплитуда - половина размаха в окне, затем экспоненциальное сглаживание.
+        if not self.samples:
+            return self.roll_amplitude, self.pitch_amplitude
+        _, rolls, pitches = zip(*self.samples)
+        roll = (max(rolls) - min(rolls)) / 2
+        pitch = (max(pitches) - min(pitches)) / 2
+        if self.roll_amplitude is None or not self.smoothing:
+            self.roll_amplitude, self.pitch_amplitude = roll, pitch
+        else:
+            a = self.smoothing
+            self.roll_amplitude = a * self.roll_amplitude + (1 - a) * roll
+            self.pitch_amplitude = a * self.pitch_amplitude + (1 - a) * pitch
+        return self.roll_amplitude, self.pitch_amplitude
+
+
+class _UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self, feed):
+        self.feed = feed
+
+    def datagram_received(self, data, addr):
+        now = time.monotonic()
+        for line in data.decode("ascii", "replace").splitlines():
+            self.feed.handle_line(line, now)
+
+
+class SensorFeed:
+    def __init__(self, engine=None, wave_direction=0.0, window=30.0, smoothing=0.3, max_rate=2.0,
+                 maxlen=1000):
+        self.engine = engine or DecisionEngine()
+        self.wave_direction = wave_direction
+        self.window = MotionWindow(window, smoothing)
+        self.min_interval = 1.0 / max_rate
+        self.results = queue.Queue()
+        self.heading = None
+        self.speed = None
+        self.samples_received = 0
+        self.analyses = 0
+        self.latencies = deque(maxlen=maxlen)
+        self._pending_since = None
+        self._loop = None
+        self._thread = None
+        self._dirty = None
+        self._servers = []
+        self._clients = set()
+        self._main_task = None
+        self._ready = threading.Event()
+        self._error = None
+
+    def handle_line(self, line, received_at=None):
+        # Вызывается в потоке асинхронного цикла (протоколы UDP/TCP).
+        parsed = parse_nmea(line)
+        if parsed is None:
+            return
+        received_at = time.monotonic() if received_at is None else received_at
+        kind, value = parsed
+        if kind == "heading":
+            self.heading = value
+        elif kind == "speed":
+            self.speed = value
+        else:
+            self.window.add(received_at, *value)
+        self.samples_received += 1
+        if self._pending_since is None:
+            self._pending_since = received_at
+        if self._dirty is not None:
+            self._dirty.set()
+
+    def _analyze(self, roll, pitch, heading, speed, sample_time):
+        result = self.engine.analyze(roll, pitch, heading, speed)
+        result.update({"roll": roll, "pitch": pitch, "heading": heading, "speed": speed,
+                       "sample_time": sample_time, "analyzed_at": time.monotonic()})
+        return result
+
+    async def _analysis_loop(self):
+        last = 0.0
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._dirty.wait()
+            # Ограничение частоты: всё, что пришло за паузу, уйдёт в один прогон.
+            delay = last + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._dirty.clear()
+            sample_time, self._pending_since = self._pending_since, None
+            if self.heading is None or not self.window.samples:
+                continue
+            last = time.monotonic()
+            # Входы снимаются в потоке цикла; в пул уходит только расчёт,
+            # чтобы приём сообщений не ждал анализа.
+            roll, pitch = self.window.amplitudes()
+            heading = relative_heading(self.heading, self.wave_direction)
+            result = await loop.run_in_executor(None, self._analyze, roll, pitch, heading,
+                                                self.speed, sample_time)
+            self.analyses += 1
+            self.results.put(result)
+
+    async def serve_udp(self, host="127.0.0.1", port=10110):
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _UdpProtocol(self), local_addr=(host, port))
+        self._servers.append(transport)
+        return transport
+
+    async def serve_tcp(self, host="127.0.0.1", port=10110):
+        async def client(reader, writer):
+            self._clients.add(writer)
+            try:
+                while line := await reader.readline():
+                    self.handle_line(line.decode("ascii", "replace"))
+            except ConnectionError:
+                pass
+            finally:
+                self._clients.discard(writer)
+                writer.close()
+
+        server = await asyncio.start_server(client, host, port)
+        self._servers.append(server)
+        return server
+
+    async def _main(self, udp, tcp):
+        self._dirty = asyncio.Event()
+        try:
+            if udp:
+                await self.serve_udp(*udp)
+            if tcp:
+                await self.serve_tcp(*tcp)
+            self._ready.set()
+            await self._analysis_loop()
+        finally:
+            for server in self._servers:
+                server.close()
+            for writer in list(self._clients):
+                writer.close()
+            # Клиентские соединения завершаются сами, получив EOF.
+            await asyncio.sleep(0.05)
+
+    def start(self, udp=None, tcp=None):
+        # udp/tcp - пары (host, port); цикл запускается в фоновом потоке.
+        # Ошибка запуска (например, порт занят) передаётся из потока и
+        # поднимается здесь же.
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._main_task = self._loop.create_task(self._main(udp, tcp))
+            try:
+                self._loop.run_until_complete(self._main_task)
+            except asyncio.CancelledError:
+                pass
+            except Exception as exc:
+                self._error = exc
+                self._ready.set()
+            finally:
+                self._loop.run_until_complete(self._loop.shutdown_default_executor())
+                self._loop.close()
+
+        self._error = None
+        self._ready.clear()
+        self._thread = threading.Thread(target=run, name="sensor-feed", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(5):
+            self.stop()
+            raise RuntimeError("sensor feed did not start within 5 s")
+        if self._error is not None:
+            self._thread.join(5)
+            raise self._error
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._main_task is not None:
+            self._loop.call_soon_threadsafe(self._main_task.cancel)
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def poll(self):
+        # Последний готовый результат (промежуточные отбрасываются) или None.
+        result = None
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                return result
+
+    def record_displayed(self, result):
+        latency = time.monotonic() - result["sample_time"]
+        self.latencies.append(latency)
+        return latency
+
+    def latency_stats(self):
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        return {"count": len(values), "mean": statistics.fmean(values),
+                "p50": values[len(values) // 2], "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+                "max": values[-1]}
+
+
+async def simulate(host="127.0.0.1", port=10110, rate=20.0, duration=None, heading=120.0, speed=14.0,
+                   roll_amplitude=15.0, pitch_amplitude=3.0, roll_period=13.5, pitch_period=5.6):
+    # Имитатор ИНС/НМЕА для проверки: синусоидальная качка с шумом, курс и
+    # скорость с небольшим дрейфом, всё по UDP на host:port.
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    start = time.monotonic()
+    sent = 0
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            t = time.monotonic() - start
+            roll = roll_amplitude * math.sin(2 * math.pi * t / roll_period) + random.gauss(0, 0.3)
+            pitch = pitch_amplitude * math.sin(2 * math.pi * t / pitch_period) + random.gauss(0, 0.1)
+            hdg = (heading + 2 * math.sin(t / 60)) % 360
+            lines = [nmea_sentence(f"PHTRO,{abs(pitch):.2f},{'M' if pitch >= 0 else 'P'},"
+                                   f"{abs(roll):.2f},{'B' if roll >= 0 else 'T'}")]
+            if sent % max(int(rate), 1) == 0:
+                lines.append(nmea_sentence(f"HEHDT,{hdg:.1f},T"))
+                lines.append(nmea_sentence(f"GPVTG,{hdg:.1f},T,,M,{speed:.1f},N,{speed * 1.852:.1f},K,A"))
+            transport.sendto(("\r\n".join(lines) + "\r\n").encode("ascii"))
+            sent += 1
+            await asyncio.sleep(1.0 / rate)
+    finally:
+        transport.close()
+    return sent
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Приём NMEA-данных качки и анализ в реальном времени")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    listen = sub.add_parser("listen", help="принимать данные и печатать решения")
+    listen.add_argument("--host", default="127.0.0.1")
+    listen.add_argument("--port", type=int, default=10110)
+    listen.add_argument("--tcp", action="store_true", help="TCP вместо UDP")
+    listen.add_argument("--wave-direction", type=float, default=0.0)
+    listen.add_argument("--max-rate", type=float, default=2.0, help="анализов в секунду, не больше")
+    listen.add_argument("--duration", type=float)
+
+    sim = sub.add_parser("simulate", help="слать синтетические NMEA-строки по UDP")
+    sim.add_argument("--host", default="127.0.0.1")
+    sim.add_argument("--port", type=int, default=10110)
+    sim.add_argument("--rate", type=float, default=20.0)
+    sim.add_argument("--duration", type=float)
+    args = parser.parse_args(argv)
+
+    if args.command == "simulate":
+        sent = asyncio.run(simulate(args.host, args.port, args.rate, args.duration))
+        print(f"sent {sent} datagrams", file=sys.stderr)
+        return 0
+
+    feed = SensorFeed(wave_direction=args.wave_direction, max_rate=args.max_rate)
+    endpoint = (args.host, args.port)
+    try:
+        feed.start(tcp=endpoint) if args.tcp else feed.start(udp=endpoint)
+    except OSError as exc:
+        print(f"cannot listen on {args.host}:{args.port}: {exc}", file=sys.stderr)
+        return 1
+    start = time.monotonic()
+    try:
+        while args.duration is None or time.monotonic() - start < args.duration:
+            result = feed.poll()
+            if result is not None:
+                latency = feed.record_displayed(result)
+                print(f"roll {result['roll']:5.1f}  pitch {result['pitch']:4.1f}  "
+                      f"heading {result['heading']:5.1f}  danger {result['danger']:5.1f}  "
+                      f"latency {latency * 1e3:6.1f} ms")
+            time.sleep(0.02)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        feed.stop()
+    stats = feed.latency_stats()
+    print(f"{feed.samples_received} samples, {feed.analyses} analyses", file=sys.stderr)
+    if stats:
+        print("latency ms: " + ", ".join(f"{k} {v * 1e3:.1f}" for k, v in stats.items() if k != "count"),
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import (ClosedFormCentroidDefuzzifier, DiscreteCentroidDefuzzifier,
+                                LookupTableDefuzzifier)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="точность и задержка бэкендов дефаззификации")
+    parser.add_argument("--samples", type=int, default=200_000)
+    parser.add_argument("--resolutions", type=int, nargs="+", default=[101, 251, 1001, 2501])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # Случайные уровни плюс узлы J/25, где у центроида изломы.
+    agg = np.concatenate([rng.uniform(0, 1, args.samples), np.arange(26) / 25, [0.0, 1e-9]])
+    reference = DiscreteCentroidDefuzzifier()
+    expected = reference.batch(agg)
+
+    backends = [("discrete", reference), ("closed-form", ClosedFormCentroidDefuzzifier())]
+    backends += [(f"table[{n}]", LookupTableDefuzzifier(n)) for n in args.resolutions]
+
+    scalar_args = rng.uniform(0, 1, 1000).tolist()
+    print(f"{'backend':<14}{'max |err|':>12}{'scalar ns/call':>16}{'batch ns/sample':>17}")
+    for name, backend in backends:
+        err = np.max(np.abs(backend.batch(agg) - expected))
+        scalar_err = max(abs(backend(a) - reference(a)) for a in scalar_args)
+        err = max(err, scalar_err)
+
+        n_calls = 20
+        t = min(timeit.repeat(lambda: [backend(a) for a in scalar_args], number=n_calls, repeat=3))
+        scalar_ns = t / (n_calls * len(scalar_args)) * 1e9
+        t = min(timeit.repeat(lambda: backend.batch(agg), number=3, repeat=3))
+        batch_ns = t / (3 * agg.size) * 1e9
+        print(f"{name:<14}{err:>12.2e}{scalar_ns:>16.0f}{batch_ns:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
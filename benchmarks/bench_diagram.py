@@ -0,0 +1,149 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import VesselDynamicsModel
+from ShipModeControl import PolarDiagramRenderer
+
+
+class FakeCanvas:
+    # Минимальная замена tk.Canvas без дисплея: хранит элементы и считает вызовы.
+    def __init__(self, width=580, height=400):
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.created = 0
+        self.moved = 0
+        self._next_id = 1
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def _create(self, kind, *coords, **options):
+        item = self._next_id
+        self._next_id += 1
+        self.items[item] = (kind, coords, options)
+        self.created += 1
+        return item
+
+    def create_arc(self, *coords, **options):
+        return self._create("arc", *coords, **options)
+
+    def create_text(self, *coords, **options):
+        return self._create("text", *coords, **options)
+
+    def create_line(self, *coords, **options):
+        return self._create("line", *coords, **options)
+
+    def create_oval(self, *coords, **options):
+        return self._create("oval", *coords, **options)
+
+    def create_rectangle(self, *coords, **options):
+        return self._create("rectangle", *coords, **options)
+
+    def create_polygon(self, *coords, **options):
+        return self._create("polygon", *coords, **options)
+
+    def coords(self, item, *coords):
+        kind, _, options = self.items[item]
+        self.items[item] = (kind, coords, options)
+        self.moved += 1
+
+    def delete(self, tag):
+        if tag == "all":
+            self.items.clear()
+        else:
+            for item in [i for i, (_, _, o) in self.items.items() if o.get("tags") == tag]:
+                del self.items[item]
+
+
+def legacy_draw(canvas, model, wave_length, speed, heading):
+    # Прежний draw_diagram: полная перерисовка с построчными прямоугольниками.
+    canvas.delete("all")
+    w, h = canvas.winfo_width(), canvas.winfo_height()
+    cx, cy = w / 2, h - 30
+    R = min(cx, cy) * 0.95
+    scale = R / model.max_speed
+    for v in range(5, 25, 5):
+        r = v * scale
+        canvas.create_arc(cx - r, cy - r, cx + r, cy + r, start=0, extent=180)
+        canvas.create_text(cx + r + 5, cy - 5, text=str(v))
+    for a in range(0, 181, 30):
+        rad = math.radians(a)
+        x = cx - R * math.cos(rad)
+        y = cy - R * math.sin(rad)
+        canvas.create_line(cx, cy, x, y)
+        canvas.create_text(x, y - 10, text=f"{a}°")
+    zones = model.calculate_resonance_zones(wave_length)
+    step = 2
+    for y in range(int(cy - R), int(cy), step):
+        dy = cy - y
+        if R**2 - dy**2 < 0:
+            continue
+        hw = math.sqrt(R**2 - dy**2)
+        left_limit, right_limit = cx - hw, cx + hw
+        for z in zones:
+            x1 = cx - z["max"] * scale
+            x2 = cx - z["min"] * scale
+            lx = max(min(x1, x2), left_limit)
+            rx = min(max(x1, x2), right_limit)
+            if lx < rx:
+                y_offset = y + z["offset"] * step
+                canvas.create_rectangle(lx, y_offset, rx, y_offset + step, fill=z["color"])
+    rad = math.radians(heading)
+    sx = cx - speed * scale * math.cos(rad)
+    sy = cy - speed * scale * math.sin(rad)
+    canvas.create_line(cx, cy, sx, sy)
+    canvas.create_oval(sx - 5, sy - 5, sx + 5, sy + 5)
+    for i in range(3):
+        canvas.create_rectangle(20, 20 + i * 25, 35, 35 + i * 25)
+        canvas.create_text(40, 27 + i * 25, text="")
+
+
+def frame_time(frames, draw):
+    t0 = time.perf_counter()
+    for k in range(frames):
+        draw(k)
+    return (time.perf_counter() - t0) / frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="время кадра draw_diagram на фиктивном холсте")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--width", type=int, default=580)
+    parser.add_argument("--height", type=int, default=400)
+    args = parser.parse_args()
+
+    model = VesselDynamicsModel()
+    wave_length = 1.2 * model.length
+
+    canvas = FakeCanvas(args.width, args.height)
+    t_legacy = frame_time(args.frames, lambda k: legacy_draw(canvas, model, wave_length, 16, k % 181))
+    legacy_items = len(canvas.items)
+
+    canvas = FakeCanvas(args.width, args.height)
+    renderer = PolarDiagramRenderer(canvas)
+
+    def resize(k):
+        canvas.width = args.width + k % 2
+        renderer.draw(model, wave_length, 16, k % 181)
+
+    t_resize = frame_time(args.frames, resize)
+    layered_items = len(canvas.items)
+    t_update = frame_time(args.frames, lambda k: renderer.draw(model, wave_length, 16, k % 181))
+
+    print(f"canvas items:        legacy {legacy_items}, layered {layered_items}")
+    print(f"legacy full redraw:  {t_legacy * 1e6:8.1f} us/frame")
+    print(f"layered rebuild:     {t_resize * 1e6:8.1f} us/frame (resize)")
+    print(f"layered update:      {t_update * 1e6:8.1f} us/frame (heading change)")
+
+
+if __name__ == "__main__":
+    main()
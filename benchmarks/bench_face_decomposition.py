@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FaceDecomposition import SOLVERS, fit_model, reconstruction_error
+
+
+def synthetic_corpus(path, n, h=64, w=64, rank=60, chunk=4096, seed=0):
+    # Низкоранговый корпус с шумом пишется в .npy по частям и дальше читается
+    # только через memmap, как большой набор лиц на диске.
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, h * w)).astype(np.float32)
+    scale = (1.0 / np.arange(1, rank + 1)).astype(np.float32)
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(n, h, w))
+    for start in range(0, n, chunk):
+        m = min(chunk, n - start)
+        coef = rng.standard_normal((m, rank)).astype(np.float32) * scale
+        block = coef @ basis + 0.01 * rng.standard_normal((m, h * w), dtype=np.float32)
+        out[start:start + m] = block.reshape(m, h, w)
+    out.flush()
+    del out
+    return np.load(path, mmap_mode="r")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="время обучения, пиковая память и ошибка восстановления по решателям PCA")
+    parser.add_argument("--images", type=int, default=10_000)
+    parser.add_argument("--components", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=2048)
+    parser.add_argument("--solvers", nargs="+", choices=tuple(SOLVERS), default=tuple(SOLVERS))
+    parser.add_argument("--corpus", help="готовый .npy (n, h, w); по умолчанию синтетический во временном каталоге")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            images = np.load(args.corpus, mmap_mode="r")
+        else:
+            images = synthetic_corpus(os.path.join(tmp, "faces.npy"), args.images)
+        X = images.reshape(images.shape[0], -1)
+        print(f"corpus: {images.shape[0]} x {images.shape[1]}x{images.shape[2]} "
+              f"({X.nbytes / 2 ** 20:.0f} MiB on disk), {args.components} components")
+        print(f"{'solver':<12} {'fit, s':>8} {'peak, MiB':>10} {'rel. error':>11}")
+
+        for solver in args.solvers:
+            # Время и память меряются отдельными прогонами: tracemalloc
+            # заметно замедляет выделения.
+            t0 = time.perf_counter()
+            model = fit_model(images, args.components, solver=solver, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - t0
+
+            tracemalloc.start()
+            fit_model(images, args.components, solver=solver, batch_size=args.batch_size)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            error = reconstruction_error(model, X, args.batch_size)
+            print(f"{solver:<12} {elapsed:8.2f} {peak / 2 ** 20:10.1f} {error:11.5f}")
+        del images, X
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.transforms import Bbox
+from sklearn.decomposition import PCA
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from FaceModel import IncrementalReconstructor
+
+
+def synthetic_faces(n=400, h=64, w=64, rank=40, seed=0):
+    # Низкоранговые "лица" размером как у Olivetti, чтобы не качать датасет.
+    rng = np.random.default_rng(seed)
+    X = rng.random((n, rank)) @ rng.random((rank, h * w)) / rank
+    return X.astype(np.float32), h, w
+
+
+def slider_trace(n, components=5, seed=1):
+    rng = np.random.default_rng(seed)
+    return list(zip(rng.integers(0, components, n).tolist(), rng.normal(0, 1, n).tolist()))
+
+
+def per_update(trace, update):
+    t0 = time.perf_counter()
+    for idx, value in trace:
+        update(idx, value)
+    return (time.perf_counter() - t0) / len(trace)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="задержка обновления изображения при движении ползунка")
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--components", type=int, default=150)
+    args = parser.parse_args()
+
+    X, h, w = synthetic_faces()
+    pca = PCA(n_components=args.components, whiten=True).fit(X)
+    trace = slider_trace(args.updates)
+
+    def make_figure(animated):
+        fig, ax = plt.subplots(figsize=(6, 6))
+        img = ax.imshow(pca.mean_.reshape(h, w), cmap="gray", animated=animated)
+        ax.axis("off")
+        title = ax.set_title("PCA components", animated=animated)
+        fig.canvas.draw()
+        return fig, ax, img, title
+
+    coef = np.zeros(args.components)
+
+    def legacy_math(idx, value):
+        coef[idx] = value
+        return pca.inverse_transform(coef.reshape(1, -1)).reshape(h, w)
+
+    fig_old, _, img_old, title_old = make_figure(False)
+
+    def legacy(idx, value):
+        img_old.set_array(legacy_math(idx, value))
+        title_old.set_text(f"PCA components: {coef[:5].round(1)}")
+        fig_old.canvas.draw()
+
+    reconstructor = IncrementalReconstructor.from_pca(pca, (h, w))
+    fig, ax, img, title = make_figure(True)
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+
+    def incremental(idx, value):
+        img.set_array(reconstructor.set(idx, value))
+        title.set_text(f"PCA components: {reconstructor.coef[:5].round(1)}")
+        fig.canvas.restore_region(background)
+        ax.draw_artist(img)
+        ax.draw_artist(title)
+        fig.canvas.blit(Bbox.union([ax.bbox, title.get_window_extent()]))
+
+    t_math_old = per_update(trace, legacy_math)
+    coef[:] = 0
+    t_math_new = per_update(trace, reconstructor.set)
+    err = np.abs(pca.inverse_transform(reconstructor.coef.reshape(1, -1))[0] - reconstructor.buffer).max()
+    reconstructor.reset()
+    coef[:] = 0
+    t_old = per_update(trace, legacy)
+    t_new = per_update(trace, incremental)
+    plt.close("all")
+
+    print(f"reconstruction: inverse_transform {t_math_old * 1e6:8.1f} us, incremental {t_math_new * 1e6:8.1f} us")
+    print(f"full frame:     legacy            {t_old * 1e3:8.2f} ms, incremental+blit {t_new * 1e3:6.2f} ms")
+    print(f"frame rate:     legacy {1 / t_old:6.0f} fps, incremental+blit {1 / t_new:6.0f} fps")
+    print(f"max |err| vs inverse_transform: {err:.2e}")
+
+
+if __name__ == "__main__":
+    main()
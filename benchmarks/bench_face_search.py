@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_face_decomposition import synthetic_corpus
+from FaceDecomposition import fit_model
+from FaceSearch import FaceIndex, project
+
+
+def main():
+    parser = argparse.ArgumentParser(description="пропускная способность проекции и поиска ближайших лиц")
+    parser.add_argument("--images", type=int, default=20_000, help="размер индекса")
+    parser.add_argument("--queries", type=int, default=5_000)
+    parser.add_argument("--components", type=int, default=150)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--single", type=int, default=500, help="сколько запросов прогнать по одному")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        faces = synthetic_corpus(os.path.join(tmp, "faces.npy"), args.images + args.queries)
+        train, queries = faces[:args.images], faces[args.images:]
+        model = fit_model(train, args.components, solver="randomized")
+
+        t0 = time.perf_counter()
+        index = FaceIndex.build(model, train)
+        t_build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        coords, errors = project(model, queries)
+        t_project = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        distances, indices = index.query(coords, args.k)
+        t_query = time.perf_counter() - t0
+
+        m = min(args.single, args.queries)
+        t0 = time.perf_counter()
+        for i in range(m):
+            index.query(coords[i], args.k)
+        t_single = (time.perf_counter() - t0) / m
+
+        # Проверка против прямого перебора с сортировкой по всем расстояниям.
+        reference = np.asarray(index.coords, dtype=np.float64)
+        hits = 0
+        for i in range(200):
+            exact = np.argsort(np.linalg.norm(reference - coords[i], axis=1))[:args.k]
+            hits += len(set(exact) & set(indices[i]))
+        recall = hits / (200 * args.k)
+        del faces, train, queries
+
+    print(f"index: {len(index)} faces x {args.components} components, built in {t_build:.2f} s "
+          f"({len(index) / t_build:.0f} images/s)")
+    print(f"project + error:  {args.queries / t_project:10.0f} images/s")
+    print(f"batched k={args.k} query: {args.queries / t_query:10.0f} queries/s")
+    print(f"single query:     {1 / t_single:10.0f} queries/s ({t_single * 1e3:.2f} ms)")
+    print(f"end-to-end batch: {args.queries / (t_project + t_query):10.0f} images/s")
+    print(f"recall@{args.k} vs exact float64 search (200 queries): {recall:.4f}")
+    print(f"error: median {np.median(errors):.3g}, p99 {np.percentile(errors, 99):.3g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import VesselDynamicsModel, VesselFleet
+
+
+def make_hulls(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {"length": rng.uniform(50, 200, n), "beam": rng.uniform(8, 30, n),
+            "draft": rng.uniform(3, 12, n), "metacentric_height": rng.uniform(0.4, 2.5, n)}
+
+
+def measure(fn):
+    # Время и память меряются отдельными прогонами: tracemalloc сильно
+    # замедляет код с большим числом мелких объектов.
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    del result
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="резонансные зоны: объекты по судам против VesselFleet")
+    parser.add_argument("--vessels", type=int, default=2000)
+    parser.add_argument("--wave-lengths", type=int, default=100)
+    args = parser.parse_args()
+
+    hulls = make_hulls(args.vessels)
+    wave_lengths = np.linspace(20, 300, args.wave_lengths)
+
+    def per_vessel():
+        out = []
+        for i in range(args.vessels):
+            model = VesselDynamicsModel()
+            for field, values in hulls.items():
+                setattr(model, field, values[i])
+            model.recalculate_periods()
+            out.append([model.calculate_resonance_zones(wl) for wl in wave_lengths.tolist()])
+        return out
+
+    def fleet():
+        return VesselFleet(args.vessels, **hulls).resonance_zones(wave_lengths)
+
+    zones_list, t_list, mem_list = measure(per_vessel)
+    zones_arr, t_arr, mem_arr = measure(fleet)
+
+    ref = np.array([[[(z["min"], z["max"]) for z in zs] for zs in v] for v in zones_list])
+    print(f"{args.vessels} vessels x {args.wave_lengths} wave lengths")
+    print(f"per-vessel objects: {t_list:8.3f} s, peak {mem_list / 1e6:8.1f} MB")
+    print(f"VesselFleet:        {t_arr:8.3f} s, peak {mem_arr / 1e6:8.1f} MB")
+    print(f"identical:          {np.array_equal(ref, zones_arr)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import FuzzyDecisionSystem
+
+
+def make_samples(n, seed=0):
+    rng = np.random.default_rng(seed)
+    roll = rng.uniform(0, 30, n)
+    pitch = rng.uniform(0, 10, n)
+    r_roll = rng.uniform(0, 2.5, n)
+    r_pitch = rng.uniform(0, 2.5, n)
+    return roll, pitch, r_roll, r_pitch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="evaluate vs evaluate_batch")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--scalar-samples", type=int, default=100_000,
+                        help="сколько выборок прогнать скалярным путём (время экстраполируется)")
+    args = parser.parse_args()
+
+    fuzzy = FuzzyDecisionSystem()
+    roll, pitch, r_roll, r_pitch = make_samples(args.samples)
+
+    t0 = time.perf_counter()
+    batch = fuzzy.evaluate_batch(roll, pitch, r_roll, r_pitch)
+    t_batch = time.perf_counter() - t0
+
+    m = min(args.scalar_samples, args.samples)
+    danger = np.empty(m)
+    level = np.empty(m)
+    rules = np.empty((m, 3))
+    t0 = time.perf_counter()
+    for i in range(m):
+        res = fuzzy.evaluate(roll[i], pitch[i], r_roll[i], r_pitch[i])
+        danger[i] = res["danger"]
+        level[i] = res["level"]
+        rules[i] = res["rules"]
+    t_scalar = (time.perf_counter() - t0) * args.samples / m
+
+    exact = (np.array_equal(danger, batch["danger"][:m])
+             and np.array_equal(level, batch["level"][:m])
+             and np.array_equal(rules, np.stack(batch["rules"], axis=1)[:m]))
+
+    print(f"samples:         {args.samples}")
+    print(f"evaluate:        {t_scalar:.2f} s" + (" (экстраполяция)" if m < args.samples else ""))
+    print(f"evaluate_batch:  {t_batch:.3f} s")
+    print(f"speedup:         {t_scalar / t_batch:.0f}x")
+    print(f"bit-exact on {m}: {exact}")
+    return 0 if exact else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import VesselDynamicsModel
+
+
+def trace(n, seed=0):
+    # Вахта: длина волны почти не меняется, курс и скорость - в пределах
+    # ручного ввода с шагом 0.1.
+    rng = np.random.default_rng(seed)
+    wave_length = np.round(108 + rng.normal(0, 0.3, n), 1)
+    speed = np.round(16 + rng.normal(0, 0.5, n), 1)
+    heading = np.round(90 + rng.normal(0, 5, n), 1)
+    return list(zip(wave_length.tolist(), speed.tolist(), heading.tolist()))
+
+
+def run(model, calls):
+    t0 = time.perf_counter()
+    for wl, sp, hd in calls:
+        model.calculate_resonance_zones(wl)
+        model.calculate_apparent_wave_period(wl, sp, hd)
+    return (time.perf_counter() - t0) / len(calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="эффективность кэша VesselDynamicsModel")
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--cache-size", type=int, default=256)
+    args = parser.parse_args()
+
+    calls = trace(args.calls)
+    configs = [
+        ("no cache", dict(cache_size=0)),
+        ("exact", dict(cache_size=args.cache_size)),
+        ("quantized", dict(cache_size=args.cache_size,
+                           quantization={"wave_length": 1.0, "speed": 0.5, "heading": 1.0})),
+    ]
+    for name, kwargs in configs:
+        model = VesselDynamicsModel(**kwargs)
+        t = run(model, calls)
+        info = model.cache_info()
+        print(f"{name:<10} {t * 1e6:7.2f} us/probe  hit rate {info['hit_rate']:6.1%}  "
+              f"(hits {info['hits']}, misses {info['misses']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PriceProject"))
+
+from PricePipeline import HERE, TARGET, PriceImputer, PriceModel, PricePreprocessor, load_data, log_target, remove_outliers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="задержка предсказания цены для одной записи и пакета")
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--batch-repeat", type=int, default=20, help="во сколько раз размножить test.csv для пакета")
+    args = parser.parse_args()
+
+    df_train, df_test = load_data(os.path.join(HERE, "train.csv"), os.path.join(HERE, "test.csv"))
+    df_train = remove_outliers(log_target(df_train))
+    t0 = time.perf_counter()
+    model = PriceModel.fit(df_train)
+    t_fit = time.perf_counter() - t0
+
+    records = df_test.head(args.records).to_dict("records")
+    frames = [df_test.iloc[[i]] for i in range(len(records))]
+
+    # Прежний способ оценить одну запись: DataFrame из одной строки через
+    # sklearn/xgboost predict.
+    t0 = time.perf_counter()
+    legacy = [float(model.predict(frame)[0]) for frame in frames]
+    t_legacy = (time.perf_counter() - t0) / len(records)
+
+    model.predict_record(records[0])
+    t0 = time.perf_counter()
+    single = [model.predict_record(record) for record in records]
+    t_single = (time.perf_counter() - t0) / len(records)
+
+    bulk = pd.concat([df_test] * args.batch_repeat, ignore_index=True)
+    t0 = time.perf_counter()
+    batch = model.predict(bulk)
+    t_batch = time.perf_counter() - t0
+
+    err = np.max(np.abs(np.array(single) - batch[:len(single)]) / batch[:len(single)])
+    err_legacy = np.max(np.abs(np.array(legacy) - np.array(single)) / np.array(single))
+    # Плотная раскладка без порядковых кодов и без заполнения по группам на
+    # обучающей выборке совпадает с pd.get_dummies.
+    legacy_pre = PricePreprocessor(sparse=False, ordinal=False, dtype=np.float64,
+                                   imputer=PriceImputer(groups=None)).fit(df_train)
+    train = df_train.drop(columns=["Id", TARGET])
+    filled = train.astype({c: object for c in legacy_pre.cat_cols})
+    filled = filled.fillna({c: legacy_pre.MISSING for c in legacy_pre.cat_cols})
+    filled = filled.fillna(dict(zip(legacy_pre.num_cols, legacy_pre.imputer.medians)))
+    dummies = pd.get_dummies(filled, columns=legacy_pre.cat_cols)
+    same_layout = (list(dummies.columns) == legacy_pre.feature_names
+                   and np.array_equal(dummies.to_numpy(dtype=np.float64), legacy_pre.transform(df_train)))
+
+    print(f"features: {model.preprocessor.n_features}, fit {t_fit:.2f} s")
+    print(f"single record, DataFrame + predict: {t_legacy * 1e3:7.3f} ms")
+    print(f"single record, predict_record:      {t_single * 1e3:7.3f} ms ({1 / t_single:.0f} rows/s)")
+    print(f"batch of {len(bulk)}: {t_batch:.3f} s ({len(bulk) / t_batch:.0f} rows/s)")
+    print(f"max rel. diff record vs batch: {err:.2e}, vs DataFrame path: {err_legacy:.2e}")
+    print(f"layout matches pd.get_dummies on train: {same_layout}")
+    return 0 if same_layout and err < 1e-5 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
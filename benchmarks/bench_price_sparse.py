@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "PriceProject"))
+
+from PricePipeline import HERE, RIDGE_ALPHAS, TARGET, PricePreprocessor, load_data, log_target, remove_outliers
+
+
+def legacy_encode(df):
+    # Прежний путь: медианы/UNKNOWN и pd.get_dummies по всей таблице.
+    df = df.drop(columns=["Id", TARGET])
+    df = df.astype({c: object for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])})
+    values = {c: ("UNKNOWN" if not pd.api.types.is_numeric_dtype(df[c]) else df[c].median()) for c in df.columns}
+    df = df.fillna(value=values)
+    cat_cols = [c for c in df.columns if not pd.api.types.is_numeric_dtype(df[c])]
+    return pd.get_dummies(df, columns=cat_cols)
+
+
+def matrix_bytes(X):
+    if isinstance(X, pd.DataFrame):
+        return int(X.memory_usage(deep=True).sum())
+    if hasattr(X, "indptr"):
+        return X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+    return X.nbytes
+
+
+def measure(encode):
+    t0 = time.perf_counter()
+    X = encode()
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    encode()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return X, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="память и время обучения: get_dummies против CSR float32")
+    parser.add_argument("--rows", type=int, default=200_000, help="размер размноженной обучающей таблицы")
+    parser.add_argument("--xgb-rounds", type=int, default=100)
+    args = parser.parse_args()
+
+    import xgboost as xgb
+    from sklearn.linear_model import RidgeCV
+
+    df_train, _ = load_data(os.path.join(HERE, "train.csv"), os.path.join(HERE, "test.csv"))
+    df_train = remove_outliers(log_target(df_train))
+    rng = np.random.default_rng(0)
+    big = df_train.iloc[rng.integers(0, len(df_train), args.rows)].reset_index(drop=True)
+    y = big[TARGET].to_numpy()
+
+    variants = {
+        "get_dummies": lambda: legacy_encode(big),
+        "dense float64": lambda: PricePreprocessor(sparse=False, ordinal=False, dtype=np.float64).fit(big).transform(big),
+        "CSR float32": lambda: PricePreprocessor().fit(big).transform(big),
+    }
+    print(f"{args.rows} rows")
+    print(f"{'variant':<15} {'features':>8} {'matrix MiB':>11} {'encode peak MiB':>16} {'encode s':>9} "
+          f"{'ridge s':>8} {'xgb s':>7}")
+    for name, encode in variants.items():
+        X, t_encode, peak = measure(encode)
+        if isinstance(X, pd.DataFrame):
+            # sklearn/xgboost всё равно переводят таблицу в плотный float64.
+            X = X.to_numpy(dtype=np.float64)
+        t0 = time.perf_counter()
+        RidgeCV(alphas=RIDGE_ALPHAS).fit(X, y)
+        t_ridge = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        xgb.XGBRegressor(n_estimators=args.xgb_rounds, max_depth=2, learning_rate=0.2).fit(X, y)
+        t_xgb = time.perf_counter() - t0
+        size = matrix_bytes(encode()) if name == "get_dummies" else matrix_bytes(X)
+        print(f"{name:<15} {X.shape[1]:8d} {size / 2 ** 20:11.1f} {peak / 2 ** 20:16.1f} {t_encode:9.2f} "
+              f"{t_ridge:8.2f} {t_xgb:7.2f}")
+        del X
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import FuzzyDecisionSystem, VesselDynamicsModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="время построения полярной карты опасности")
+    parser.add_argument("--heading-step", type=float, default=1.0)
+    parser.add_argument("--speed-step", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    model = VesselDynamicsModel()
+    fuzzy = FuzzyDecisionSystem()
+    wave_length = 1.2 * model.length
+
+    def run():
+        headings, speeds, danger = fuzzy.danger_map(
+            model, wave_length, 18.0, 4.0, args.heading_step, args.speed_step)
+        return fuzzy.select_safe_setting(headings, speeds, danger, 170.0, 16.0)
+
+    headings, speeds, danger = fuzzy.danger_map(
+        model, wave_length, 18.0, 4.0, args.heading_step, args.speed_step)
+    # Сверка со скалярным путём на подсетке.
+    worst = 0.0
+    for i in range(0, headings.size, 7):
+        for j in range(0, speeds.size, 3):
+            tau = model.calculate_apparent_wave_period(wave_length, speeds[j], headings[i])
+            r_roll = model.roll_period / tau if tau < 900 else 0
+            r_pitch = model.pitch_period / tau if tau < 900 else 0
+            ref = fuzzy.evaluate(18.0, 4.0, r_roll, r_pitch)["danger"]
+            worst = max(worst, abs(ref - danger[i, j]))
+
+    t = min(timeit.repeat(run, number=args.repeat, repeat=3)) / args.repeat
+    print(f"grid:              {headings.size} x {speeds.size} = {danger.size} cells")
+    print(f"map + selection:   {t * 1e3:.2f} ms")
+    print(f"max |err| vs scalar: {worst:.2e}")
+    print(f"safe setting:      {run()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ShipDecisionEngine import DecisionEngine, WaveSpectrum
+
+
+def main():
+    parser = argparse.ArgumentParser(description="время спектральной оценки опасности")
+    parser.add_argument("--components", type=int, default=500)
+    parser.add_argument("--hs", type=float, default=3.0)
+    parser.add_argument("--tp", type=float, default=8.3)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = DecisionEngine()
+
+    def refresh():
+        # Полный цикл обновления: новый спектр (например, с волнографа) и оценка.
+        spectrum = WaveSpectrum.jonswap(args.hs, args.tp, components=args.components)
+        return engine.analyze_spectrum(spectrum, 18.0, 4.0, 150.0)
+
+    t = min(timeit.repeat(refresh, number=args.repeat, repeat=3)) / args.repeat
+    result = refresh()
+    print(f"components:   {args.components}")
+    print(f"refresh:      {t * 1e3:.3f} ms ({1 / t:.0f} Hz possible)")
+    print(f"danger:       {result['danger']:.1f}, resonances: {', '.join(result['resonances']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import argparse
+import cProfile
+import fnmatch
+import io
+import json
+import os
+import platform
+import pstats
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "PriceProject"))
+
+from bench_diagram import FakeCanvas
+from bench_face_decomposition import synthetic_corpus
+from bench_fuzzy_batch import make_samples
+
+# Общий прогон горячих путей трёх приложений (судно, лица, цены) на
+# воспроизводимых синтетических данных. Каждый бенчмарк - setup(scale, tmp),
+# возвращающий (run, ops): подготовка не входит в замер, run() повторяется
+# --repeat раз. По желанию каждый бенчмарк дополнительно прогоняется под
+# cProfile (--profile) и tracemalloc (--memory) - отдельно от замеров времени,
+# оба заметно замедляют код. Результаты пишутся в JSON и сравниваются с
+# сохранённым базовым прогоном (--baseline).
+#
+# Эталонный прогон лежит в benchmarks/baseline.json (условия - в его meta:
+# машина, версии, масштаб). Сравнение с ним: bench_suite.py --baseline.
+# Абсолютные времена зависят от машины, поэтому на другой машине сначала
+# снимите свой эталон тем же масштабом: bench_suite.py -o baseline.json, и
+# обновляйте его вместе с изменениями, которые намеренно меняют скорость.
+
+
+class Var:
+    # Замена tk.DoubleVar для методов приложения без дисплея.
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+def bench_fuzzy_evaluate(scale, tmp):
+    from ShipDecisionEngine import FuzzyDecisionSystem
+
+    fuzzy = FuzzyDecisionSystem()
+    samples = list(zip(*(a.tolist() for a in make_samples(int(20_000 * scale)))))
+
+    def run():
+        for roll, pitch, r_roll, r_pitch in samples:
+            fuzzy.evaluate(roll, pitch, r_roll, r_pitch)
+    return run, len(samples)
+
+
+def bench_fuzzy_evaluate_batch(scale, tmp):
+    from ShipDecisionEngine import FuzzyDecisionSystem
+
+    fuzzy = FuzzyDecisionSystem()
+    samples = make_samples(int(1_000_000 * scale))
+    return lambda: fuzzy.evaluate_batch(*samples), len(samples[0])
+
+
+def headless_ship_app(canvas=None):
+    # Состояние DecisionSupportApp, с которым работают его методы, без Tk.
+    from ShipDecisionEngine import DecisionEngine
+    from ShipModeControl import PolarDiagramRenderer
+
+    engine = DecisionEngine()
+    return SimpleNamespace(engine=engine, model=engine.model, fuzzy=engine.fuzzy,
+                           wave_length=engine.wave_length, speed=engine.speed,
+                           heading_var=Var(90.0), roll_var=Var(12.0), pitch_var=Var(2.5),
+                           diagram=PolarDiagramRenderer(canvas or FakeCanvas()))
+
+
+def bench_suggest_safe_heading(scale, tmp):
+    from ShipModeControl import DecisionSupportApp
+
+    app = headless_ship_app()
+    rng = np.random.default_rng(0)
+    n = max(1, int(50 * scale))
+    # Опасные ситуации с разной качкой и курсом: каждый вызов строит карту опасности.
+    cases = list(zip(rng.uniform(15, 30, n).tolist(),
+                     rng.uniform(3, 8, n).tolist(),
+                     rng.uniform(0, 180, n).tolist()))
+
+    def run():
+        for roll, pitch, heading in cases:
+            app.roll_var.set(roll)
+            app.pitch_var.set(pitch)
+            app.heading_var.set(heading)
+            DecisionSupportApp.suggest_safe_heading(app, 100)
+    return run, len(cases)
+
+
+def bench_draw_diagram(scale, tmp):
+    from ShipModeControl import DecisionSupportApp
+
+    app = headless_ship_app()
+    headings = np.random.default_rng(0).uniform(0, 180, max(1, int(20_000 * scale))).tolist()
+
+    def run():
+        for heading in headings:
+            app.heading_var.set(heading)
+            DecisionSupportApp.draw_diagram(app)
+    return run, len(headings)
+
+
+def bench_draw_diagram_resize(scale, tmp):
+    from ShipModeControl import DecisionSupportApp
+
+    canvas = FakeCanvas()
+    app = headless_ship_app(canvas)
+    frames = max(1, int(200 * scale))
+
+    def run():
+        for k in range(frames):
+            canvas.width = 580 + k % 2
+            DecisionSupportApp.draw_diagram(app)
+    return run, frames
+
+
+def face_images(scale, tmp):
+    path = os.path.join(tmp, f"faces-{scale}.npy")
+    if os.path.exists(path):
+        return np.load(path, mmap_mode="r")
+    return synthetic_corpus(path, max(10, int(2000 * scale)))
+
+
+def bench_face_fit(solver):
+    def setup(scale, tmp):
+        from FaceDecomposition import fit_model
+
+        images = face_images(scale, tmp)
+        return lambda: fit_model(images, 50, solver=solver), len(images)
+    return setup
+
+
+def bench_update_image(scale, tmp):
+    # FacePCAApp без окна: та же фигура на холсте Agg (restore_region/blit
+    # есть и у него), обновление идёт через настоящие flush_updates и update_image.
+    import matplotlib.pyplot as plt
+    from FaceDecomposition import fit_model
+    from PCA import FacePCAApp
+
+    images = face_images(scale, tmp)
+    app = FacePCAApp.__new__(FacePCAApp)
+    app.model = fit_model(images, 50)
+    app.h, app.w = images.shape[1:]
+    app.reconstructor = app.model.reconstructor()
+    app.current_components = app.reconstructor.coef
+    app.n_sliders = 5
+    app.pending, app._flush_id, app.background = {}, None, None
+    app.fig, app.ax = plt.subplots(figsize=(6, 6))
+    app.img = app.ax.imshow(app.model.mean.reshape(app.h, app.w), cmap="gray", animated=True)
+    app.ax.axis("off")
+    app.title = app.ax.set_title("Mean face + PCA components", animated=True)
+    app.canvas = app.fig.canvas
+    app.canvas.mpl_connect("draw_event", app.on_draw)
+    app.canvas.draw()
+    rng = np.random.default_rng(1)
+    n = max(1, int(300 * scale))
+    trace = list(zip(rng.integers(0, 5, n).tolist(), rng.normal(0, 1, n).tolist()))
+
+    def run():
+        for idx, value in trace:
+            app.pending[idx] = value
+            app.flush_updates()
+    return run, len(trace)
+
+
+def price_frame(scale):
+    from PricePipeline import HERE, load_data, log_target, remove_outliers
+
+    df_train, _ = load_data(os.path.join(HERE, "train.csv"), os.path.join(HERE, "test.csv"))
+    df_train = remove_outliers(log_target(df_train))
+    rows = max(1, int(len(df_train) * scale * 10))
+    return df_train.iloc[np.random.default_rng(0).integers(0, len(df_train), rows)].reset_index(drop=True)
+
+
+def bench_price_preprocess(scale, tmp):
+    from PricePipeline import PricePreprocessor
+
+    df = price_frame(scale)
+    return lambda: PricePreprocessor().fit(df).transform(df), len(df)
+
+
+def bench_price_fit(scale, tmp):
+    from PricePipeline import TARGET, PricePreprocessor, fit_models
+
+    df = price_frame(scale / 10)
+    X = PricePreprocessor().fit(df).transform(df)
+    y = df[TARGET].to_numpy()
+    return lambda: fit_models(X, y), len(df)
+
+
+BENCHMARKS = {
+    "ship.fuzzy.evaluate": bench_fuzzy_evaluate,
+    "ship.fuzzy.evaluate_batch": bench_fuzzy_evaluate_batch,
+    "ship.suggest_safe_heading": bench_suggest_safe_heading,
+    "ship.draw_diagram": bench_draw_diagram,
+    "ship.draw_diagram.resize": bench_draw_diagram_resize,
+    "face.fit.full": bench_face_fit("full"),
+    "face.fit.incremental": bench_face_fit("incremental"),
+    "face.update_image": bench_update_image,
+    "price.preprocess": bench_price_preprocess,
+    "price.fit": bench_price_fit,
+}
+
+
+def measure(name, setup, scale, tmp, repeat, profile_dir=None, memory=False):
+    run, ops = setup(scale, tmp)
+    run()  # прогрев: ленивые импорты и кэши
+    seconds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - t0)
+    median = statistics.median(seconds)
+    result = {"ops": ops, "seconds": seconds, "best": min(seconds), "median": median,
+              "per_op": median / ops, "best_per_op": min(seconds) / ops}
+    if profile_dir:
+        profiler = cProfile.Profile()
+        profiler.runcall(run)
+        path = os.path.join(profile_dir, name + ".prof")
+        profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(25)
+        with open(os.path.join(profile_dir, name + ".txt"), "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+        result["profile"] = path
+    if memory:
+        tracemalloc.start()
+        run()
+        result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def source_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    # Отношение лучшего из повторов времени на операцию к базовому (минимум
+    # меньше всего зависит от фоновой нагрузки); хуже 1 + tolerance -
+    # регрессия, лучше 1 / (1 + tolerance) - ускорение.
+    rows = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append((name, None, "new"))
+            continue
+        ratio = result["best_per_op"] / base["best_per_op"]
+        status = "slower" if ratio > 1 + tolerance else "faster" if ratio < 1 / (1 + tolerance) else "same"
+        rows.append((name, ratio, status))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="бенчмарки горячих путей судна, лиц и цен с JSON и сравнением")
+    parser.add_argument("--only", nargs="+", metavar="PATTERN", help="имена или шаблоны (ship.*, price.fit)")
+    parser.add_argument("--list", action="store_true", help="вывести имена бенчмарков")
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель размера синтетических данных")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profile", metavar="DIR", help="сохранить cProfile (.prof и .txt) по каждому бенчмарку")
+    parser.add_argument("--memory", action="store_true", help="пиковая память по tracemalloc (отдельный прогон)")
+    parser.add_argument("-o", "--output", help="записать результаты в JSON")
+    parser.add_argument("--baseline", nargs="?", const=BASELINE, metavar="JSON",
+                        help="сравнить с прошлым прогоном (без значения - с benchmarks/baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое замедление (доля)")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    names = [name for name in BENCHMARKS
+             if not args.only or any(fnmatch.fnmatchcase(name, pattern) for pattern in args.only)]
+    if not names:
+        parser.error("no benchmarks match --only")
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            result = results[name] = measure(name, BENCHMARKS[name], args.scale, tmp, args.repeat,
+                                             args.profile, args.memory)
+            peak = f" {result['peak_bytes'] / 2 ** 20:9.1f} MiB" if "peak_bytes" in result else ""
+            print(f"{name:<28} {result['per_op'] * 1e6:12.2f} us/op {result['median']:8.3f} s "
+                  f"({result['ops']} ops){peak}", flush=True)
+
+    report = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+                 "cpu_count": os.cpu_count(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "scale": args.scale, "repeat": args.repeat, "revision": source_revision()},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("scale") != args.scale:
+        print(f"warning: baseline scale {baseline.get('meta', {}).get('scale')} != {args.scale}", file=sys.stderr)
+    rows = compare(results, baseline, args.tolerance)
+    print(f"\n{'benchmark':<28} {'vs baseline':>12}")
+    for name, ratio, status in rows:
+        print(f"{name:<28} {'-' if ratio is None else f'{ratio:11.2f}x'} {status}")
+    return 1 if any(status == "slower" for _, _, status in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())